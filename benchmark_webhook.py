@@ -0,0 +1,503 @@
+"""
+WEBHOOK LOAD TEST + MICRO-BENCHMARKS (NO CLOUD NEEDED)
+======================================================
+
+WHAT THIS DOES:
+1. Generates realistic breakout-room traffic: thousands of participants,
+   bursty room reassignments (everyone LEAVEs and JOINs within seconds),
+   plus a share of Zoom retries (same payload sent twice)
+2. Sends it to zoom_webhook_bigquery.app from N threads (like gunicorn
+   --threads) with GCS and BigQuery replaced by in-process fakes that sleep
+   for a configurable latency (--asgi: zoom_webhook_asgi.app with --threads
+   concurrent clients on one event loop)
+3. Reports events/sec and p50 / p95 / p99 request latency
+4. Micro-benchmarks parse_zoom_event and the QOS reducer used by
+   fetch_qos_data (collect_video_stats with synthetic Zoom pages)
+5. Appends one JSON line per run to a results file and compares it with the
+   previous run of the same configuration
+
+WHY:
+- Throughput and tail latency could only be seen against real GCS,
+  BigQuery and Zoom
+- Same seed + same config = same traffic, so runs are comparable
+
+HOW TO RUN:
+  python benchmark_webhook.py                                   # defaults
+  python benchmark_webhook.py --participants 2000 --reassignments 5
+  python benchmark_webhook.py --gcs-latency-ms 30 --bq-latency-ms 80 --threads 8
+  PIPELINE_ENABLED=true BQ_BATCH_ENABLED=true python benchmark_webhook.py --name pipeline
+  python benchmark_webhook.py --name asgi --asgi --threads 64 --gcs-latency-ms 30 --bq-latency-ms 80
+  python benchmark_webhook.py --micro-only
+
+  Webhook settings (GCS_WRITE_MODE, PIPELINE_ENABLED, ...) come from the
+  environment as usual; they are recorded with the results.
+
+RESULTS:
+- bench_results.jsonl (--output): one JSON object per run
+  {name, timestamp, git_commit, config, load: {...}, micro: {...}}
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+import timeit
+
+import numpy as np
+
+# Webhook settings recorded with each result
+WEBHOOK_ENV = (
+    'GCS_WRITE_MODE', 'BQ_BATCH_ENABLED', 'PIPELINE_ENABLED', 'PIPELINE_WORKERS',
+    'DEDUP_ENABLED', 'ROOM_VISITS_ENABLED', 'METRICS_ENABLED', 'LOG_FORMAT',
+    'EVENT_SINKS', 'LOCAL_STORE_BACKEND', 'SPOOL_ENABLED', 'SPOOL_FSYNC_MS',
+    'ASGI_MAX_CONCURRENCY', 'ASGI_IO_THREADS',
+)
+
+# ==============================================================================
+# FAKE SINKS
+# ==============================================================================
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+
+    def upload_from_string(self, data, content_type=None, **kwargs):
+        self.bucket.client.call()
+        with self.bucket.client.lock:
+            self.bucket.client.objects[self.name] = len(data)
+
+
+class FakeBucket:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def list_blobs(self, prefix=None, **kwargs):
+        return []
+
+
+class FakeGcsClient:
+    """storage.Client stand-in: every upload sleeps latency seconds"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.objects = {}
+        self.calls = 0
+
+    def call(self):
+        with self.lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def bucket(self, name):
+        return FakeBucket(self, name)
+
+
+class FakeBigQueryClient:
+    """bigquery.Client stand-in: every insert call sleeps latency seconds"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.rows = 0
+
+    def insert_rows_json(self, table_id, rows, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.calls += 1
+            self.rows += len(rows)
+        return []
+
+# ==============================================================================
+# TRAFFIC
+# ==============================================================================
+
+def make_payload(event, ts_ms, meeting_uuid, room, participant):
+    return {
+        'event': event,
+        'event_ts': ts_ms,
+        'payload': {
+            'account_id': 'bench-account',
+            'object': {
+                'id': '85012345678',
+                'uuid': meeting_uuid,
+                'breakout_room_uuid': room,
+                'participant': participant,
+            },
+        },
+    }
+
+
+def generate_traffic(participants=1000, rooms=50, reassignments=3,
+                     burst_secs=5.0, retry_ratio=0.02, seed=42):
+    """
+    Breakout-room JOIN/LEAVE traffic for one meeting
+
+    SHAPE:
+    - Everyone JOINs a room, then `reassignments` times the host moves
+      everyone: LEAVE old room + JOIN new room, all within burst_secs
+    - retry_ratio of the events are sent twice (Zoom retries)
+
+    RETURNS:
+    - List of JSON bodies (bytes), in send order
+    """
+    rng = random.Random(seed)
+    meeting_uuid = 'benchMeeting=='
+    room_ids = [f"room-{i:04d}-{rng.getrandbits(32):08x}==" for i in range(rooms)]
+    people = [
+        {
+            'user_id': str(16000000 + i),
+            'participant_user_id': f"pu{i:06d}",
+            'user_name': f"Participant {i:05d}",
+            'email': f"p{i:05d}@example.com",
+        }
+        for i in range(participants)
+    ]
+
+    ts = 1770000000000
+    events = []
+    current = {}
+    for round_no in range(reassignments + 1):
+        for i, person in enumerate(people):
+            at = ts + int(rng.random() * burst_secs * 1000)
+            if i in current:
+                events.append((at, make_payload(
+                    'meeting.participant_left_breakout_room', at, meeting_uuid, current[i], person)))
+            current[i] = rng.choice(room_ids)
+            events.append((at + 1, make_payload(
+                'meeting.participant_joined_breakout_room', at + 1, meeting_uuid, current[i], person)))
+        ts += 15 * 60 * 1000   # next reassignment 15 minutes later
+
+    events.sort(key=lambda e: e[0])
+    bodies = [json.dumps(payload).encode('utf-8') for _, payload in events]
+
+    retries = [b for b in bodies if rng.random() < retry_ratio]
+    for body in retries:
+        bodies.insert(rng.randrange(len(bodies)), body)
+    return bodies
+
+# ==============================================================================
+# LOAD TEST
+# ==============================================================================
+
+def percentiles(values_ms):
+    if not values_ms:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    p50, p95, p99 = np.percentile(values_ms, [50, 95, 99])
+    return {
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(float(max(values_ms)), 3),
+    }
+
+
+def wait_for_drain(webhook, timeout=120):
+    """Spool / pipeline / batch / segment modes: wait until background writes finished"""
+    deadline = time.monotonic() + timeout
+    if webhook.event_spool is not None:
+        while time.monotonic() < deadline and webhook.event_spool.get_stats()['lag_bytes'] > 0:
+            time.sleep(0.01)
+    if webhook.sink_pipeline is not None:
+        while time.monotonic() < deadline:
+            stats = webhook.sink_pipeline.get_stats()
+            if stats['processed'] >= stats['accepted']:
+                break
+            time.sleep(0.01)
+    if webhook.bq_batch_writer is not None:
+        webhook.bq_batch_writer.flush(timeout=timeout)
+    if webhook.gcs_segment_writer is not None:
+        webhook.gcs_segment_writer.flush()
+    if webhook.local_batch_writer is not None:
+        webhook.local_batch_writer.flush(timeout=timeout)
+
+
+def run_load(webhook, bodies, threads=8, gcs_latency=0.0, bq_latency=0.0, asgi=False):
+    """
+    Send every body to /webhook from `threads` threads
+    (asgi=True: `threads` concurrent requests to zoom_webhook_asgi.app)
+
+    RETURNS:
+    - {'events', 'threads', 'wall_secs', 'events_per_sec', 'drain_secs',
+       'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'status_codes', 'gcs_calls',
+       'bq_calls', 'bq_rows'}
+    """
+    gcs = FakeGcsClient(gcs_latency)
+    bq = FakeBigQueryClient(bq_latency)
+    webhook.gcs_client = gcs
+    webhook.bq_client = bq
+    webhook.gcs_bucket = None  # cached handle of the previous client
+
+    latencies = [0.0] * len(bodies)
+    statuses = [0] * len(bodies)
+    local = threading.local()
+
+    def send(i):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = webhook.app.test_client()
+        start = time.perf_counter()
+        response = client.post('/webhook', data=bodies[i], content_type='application/json')
+        latencies[i] = (time.perf_counter() - start) * 1000
+        statuses[i] = response.status_code
+
+    async def send_asgi(i, app, limit):
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': bodies[i], 'more_body': False}
+
+        async def collect(message):
+            messages.append(message)
+
+        async with limit:
+            start = time.perf_counter()
+            await app({'type': 'http', 'method': 'POST', 'path': '/webhook', 'headers': []},
+                      receive, collect)
+            latencies[i] = (time.perf_counter() - start) * 1000
+            statuses[i] = messages[0]['status']
+
+    async def drive_asgi():
+        from zoom_webhook_asgi import app
+        limit = asyncio.Semaphore(threads)
+        await asyncio.gather(*(send_asgi(i, app, limit) for i in range(len(bodies))))
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        start = time.perf_counter()
+        if asgi:
+            asyncio.run(drive_asgi())
+        else:
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                list(pool.map(send, range(len(bodies))))
+        wall = time.perf_counter() - start
+
+        drain_start = time.perf_counter()
+        wait_for_drain(webhook)
+        drain = time.perf_counter() - drain_start
+
+    codes = {}
+    for code in statuses:
+        codes[str(code)] = codes.get(str(code), 0) + 1
+
+    result = {
+        'events': len(bodies),
+        'threads': threads,
+        'asgi': asgi,
+        'wall_secs': round(wall, 3),
+        'events_per_sec': round(len(bodies) / wall, 1),
+        'drain_secs': round(drain, 3),
+    }
+    result.update(percentiles(latencies))
+    result.update({
+        'status_codes': codes,
+        'gcs_calls': gcs.calls,
+        'bq_calls': bq.calls,
+        'bq_rows': bq.rows,
+    })
+    return result
+
+# ==============================================================================
+# MICRO-BENCHMARKS
+# ==============================================================================
+
+def bench(fn, repeat=5, number=1):
+    """Best of `repeat` runs, in microseconds per call"""
+    best = min(timeit.repeat(fn, repeat=repeat, number=number))
+    return round(best / number * 1e6, 2)
+
+
+def micro_parse_zoom_event(webhook, bodies, sample=2000):
+    """parse_zoom_event from request bytes (loads + parse + row encode)"""
+    from fast_json import encode_row, loads
+
+    sample = bodies[:sample]
+    now = datetime.utcnow()
+
+    def run():
+        for body in sample:
+            encode_row(webhook.parse_zoom_event(loads(body), body, now))
+
+    return {'parse_zoom_event_us': round(bench(run) / len(sample), 2)}
+
+
+def make_qos_pages(participants=300, samples=60, page_size=30, seed=42):
+    """Synthetic /metrics/meetings/{uuid}/participants/qos pages"""
+    rng = random.Random(seed)
+    start = datetime(2026, 2, 3, 10, 0, tzinfo=timezone.utc).timestamp()
+    people = []
+    for i in range(participants):
+        camera_share = rng.random()
+        qos = []
+        for s in range(samples):
+            ts = datetime.fromtimestamp(start + s * 60 + rng.randint(0, 5), timezone.utc)
+            kbps = rng.choice(['850 kbps', '1.2 Mbps', '27.15 kbps']) if rng.random() < camera_share else '0 kbps'
+            qos.append({'date_time': ts.strftime('%Y-%m-%dT%H:%M:%SZ'), 'video_input': {'bitrate': kbps}})
+        people.append({'user_id': str(16000000 + i), 'user_name': f"Participant {i:05d}", 'user_qos': qos})
+    return [people[i:i + page_size] for i in range(0, len(people), page_size)]
+
+
+def micro_qos_reducer(participants=300, samples=60):
+    """
+    collect_video_stats (the reducer behind fetch_qos_data) on synthetic pages
+
+    iter_qos_pages is swapped for a generator over in-memory pages, so only
+    the classification + aggregation is measured
+    """
+    import update_camera_data as camera
+
+    pages = make_qos_pages(participants, samples)
+    original = camera.iter_qos_pages
+
+    def fake_pages(token, meeting_uuid, page_size=None, timings=None):
+        for page in pages:
+            yield list(page)
+
+    camera.iter_qos_pages = fake_pages
+    try:
+        us = bench(lambda: camera.collect_video_stats('token', 'uuid', spill_path=''), repeat=5)
+    finally:
+        camera.iter_qos_pages = original
+
+    return {
+        'qos_reducer_ms': round(us / 1000, 3),
+        'qos_samples': participants * samples,
+        'qos_samples_per_sec': round(participants * samples / (us / 1e6)),
+    }
+
+# ==============================================================================
+# RESULTS
+# ==============================================================================
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_result(path, name):
+    """Last saved run with the same name (None if there is none)"""
+    last = None
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    if record.get('name') == name:
+                        last = record
+    except OSError:
+        pass
+    return last
+
+
+def print_comparison(current, previous):
+    """Side-by-side numbers vs. the previous run (lower is better except rates)"""
+    keys = [('load', 'events_per_sec'), ('load', 'p50_ms'), ('load', 'p95_ms'), ('load', 'p99_ms'),
+            ('micro', 'parse_zoom_event_us'), ('micro', 'qos_reducer_ms')]
+    print(f"\n  vs. previous run ({previous.get('git_commit')}, {previous.get('timestamp')}):")
+    for section, key in keys:
+        new = (current.get(section) or {}).get(key)
+        old = (previous.get(section) or {}).get(key)
+        if new is None or old is None or old == 0:
+            continue
+        change = (new - old) / old * 100
+        print(f"    {section}.{key:<22} {old:>12} -> {new:>12}  ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Webhook load test and micro-benchmarks')
+    parser.add_argument('--name', default='default', help='Configuration name (runs are compared by name)')
+    parser.add_argument('--participants', type=int, default=1000)
+    parser.add_argument('--rooms', type=int, default=50)
+    parser.add_argument('--reassignments', type=int, default=3)
+    parser.add_argument('--retry-ratio', type=float, default=0.02)
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--asgi', action='store_true', help='Load-test zoom_webhook_asgi.app instead of Flask')
+    parser.add_argument('--gcs-latency-ms', type=float, default=0.0)
+    parser.add_argument('--bq-latency-ms', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--micro-only', action='store_true', help='Skip the load test')
+    parser.add_argument('--output', default='bench_results.jsonl', help='Results file (JSON lines)')
+    args = parser.parse_args()
+
+    # Keep the test-only fakes away from real credentials
+    os.environ.setdefault('DEDUP_WARM_MINUTES', '0')
+    import zoom_webhook_bigquery as webhook
+
+    print("=" * 60)
+    print(f"WEBHOOK BENCHMARK: {args.name}")
+    print("=" * 60)
+
+    bodies = generate_traffic(args.participants, args.rooms, args.reassignments,
+                              retry_ratio=args.retry_ratio, seed=args.seed)
+    print(f"Traffic: {len(bodies)} events ({args.participants} participants, "
+          f"{args.reassignments} reassignments)")
+
+    record = {
+        'name': args.name,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'config': {
+            'participants': args.participants,
+            'rooms': args.rooms,
+            'reassignments': args.reassignments,
+            'retry_ratio': args.retry_ratio,
+            'threads': args.threads,
+            'asgi': args.asgi,
+            'gcs_latency_ms': args.gcs_latency_ms,
+            'bq_latency_ms': args.bq_latency_ms,
+            'seed': args.seed,
+            'env': {k: os.environ[k] for k in WEBHOOK_ENV if k in os.environ},
+        },
+        'load': None,
+        'micro': {},
+    }
+
+    if not args.micro_only:
+        load = run_load(webhook, bodies, args.threads,
+                        args.gcs_latency_ms / 1000, args.bq_latency_ms / 1000, asgi=args.asgi)
+        record['load'] = load
+        print(f"\nLoad: {load['events_per_sec']} events/sec over {load['wall_secs']}s "
+              f"(+{load['drain_secs']}s drain)")
+        print(f"  p50 {load['p50_ms']} ms | p95 {load['p95_ms']} ms | p99 {load['p99_ms']} ms "
+              f"| max {load['max_ms']} ms")
+        print(f"  status {load['status_codes']} | GCS calls {load['gcs_calls']} "
+              f"| BigQuery calls {load['bq_calls']} ({load['bq_rows']} rows)")
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        record['micro'].update(micro_parse_zoom_event(webhook, bodies))
+        record['micro'].update(micro_qos_reducer())
+    print(f"\nMicro: parse_zoom_event {record['micro']['parse_zoom_event_us']} us/event | "
+          f"QOS reducer {record['micro']['qos_reducer_ms']} ms for "
+          f"{record['micro']['qos_samples']} samples")
+
+    previous = previous_result(args.output, args.name)
+    if previous:
+        print_comparison(record, previous)
+
+    with open(args.output, 'a') as f:
+        f.write(json.dumps(record, sort_keys=True) + '\n')
+    print(f"\nSaved to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+-- ==============================================================================
+-- BIGQUERY SCHEDULED QUERY - INCREMENTAL DAILY REPORT (INTRADAY REFRESH)
+-- ==============================================================================
+--
+-- WHAT THIS DOES:
+-- 1. Reads the watermark (max inserted_at already reported) from report_watermarks
+-- 2. Finds the participants with raw_events inserted since then (today and
+--    yesterday's partitions only)
+-- 3. Rebuilds ONLY those participants' room visits, with the same rules as
+--    bigquery_daily_report.sql (room order, JOIN/LEAVE matching, next room)
+-- 4. MERGEs them into daily_reports: changed rows are updated, new visits
+--    inserted, visits that no longer exist removed; camera columns (written
+--    by update_camera_data.py) are kept
+-- 5. Moves the watermark forward, in the same transaction
+--
+-- WHY (vs. bigquery_daily_report.sql every few minutes):
+-- - The full query deletes and rebuilds the whole day each run
+-- - Here the work follows the new events: raw_events is clustered by
+--   participant_name, so only the changed participants' blocks are read,
+--   and only their report rows are written
+--
+-- WHY A WHOLE PARTICIPANT (not just the new events):
+-- - One new event can change every row of that participant: room numbers,
+--   meeting_join/leave_time and next_room depend on all their visits
+--
+-- LATE EVENTS:
+-- - Each run re-checks lookback_minutes before the watermark, so rows that
+--   show up late (spool replay, retries) are still picked up; recomputing
+--   a participant twice gives the same rows
+-- - Rows loaded later with old inserted_at values (load_gcs_to_bigquery.py)
+--   are only covered by the nightly bigquery_daily_report.sql, which stays
+--   scheduled as the full rebuild
+--
+-- HOW TO SCHEDULE:
+-- 1. Create report_watermarks (bigquery_setup.sql, STEP 7)
+-- 2. BigQuery Console → Scheduled Queries → Create
+-- 3. Paste this query, replace 'your-project-id'
+-- 4. Schedule: every 5 minutes (or 15), during meeting hours
+-- ==============================================================================
+
+-- Oldest partition refreshed (yesterday: events arriving around midnight)
+DECLARE first_date DATE DEFAULT DATE_SUB(CURRENT_DATE(), INTERVAL 1 DAY);
+-- Re-check this much before the watermark (late-visible rows)
+DECLARE lookback_minutes INT64 DEFAULT 15;
+DECLARE watermark TIMESTAMP;
+DECLARE new_watermark TIMESTAMP;
+
+-- First run: everything since first_date
+SET watermark = COALESCE(
+  (SELECT watermark
+   FROM `your-project-id.zoom_tracker.report_watermarks`
+   WHERE report_name = 'daily_reports'),
+  TIMESTAMP(first_date)
+);
+
+-- ==============================================================================
+-- STEP 1: Participants with new events since the watermark
+-- ==============================================================================
+CREATE TEMP TABLE changed_participants AS
+SELECT
+  event_date,
+  participant_name,
+  MAX(inserted_at) as max_inserted_at
+FROM `your-project-id.zoom_tracker.raw_events`
+WHERE event_date >= first_date
+  AND inserted_at > TIMESTAMP_SUB(watermark, INTERVAL lookback_minutes MINUTE)
+GROUP BY event_date, participant_name;
+
+SET new_watermark = (SELECT MAX(max_inserted_at) FROM changed_participants);
+
+-- ==============================================================================
+-- STEP 2: Rebuild their report rows (same rules as bigquery_daily_report.sql,
+--         per event_date because two partitions are refreshed)
+-- ==============================================================================
+CREATE TEMP TABLE changed_rows AS
+WITH
+events AS (
+  SELECT e.*
+  FROM `your-project-id.zoom_tracker.raw_events` e
+  JOIN changed_participants c
+    ON e.event_date = c.event_date
+   AND e.participant_name = c.participant_name
+  WHERE e.event_date >= first_date
+),
+
+joins AS (
+  SELECT
+    event_date,
+    participant_name,
+    COALESCE(participant_email, '') as participant_email,
+    breakout_room_uuid,
+    event_timestamp as join_time,
+    ROW_NUMBER() OVER (
+      PARTITION BY event_date, participant_name
+      ORDER BY event_timestamp
+    ) as room_number
+  FROM events
+  WHERE action = 'JOIN'
+    AND breakout_room_uuid IS NOT NULL
+    AND breakout_room_uuid != ''
+),
+
+leaves AS (
+  SELECT
+    event_date,
+    participant_name,
+    breakout_room_uuid,
+    event_timestamp as leave_time
+  FROM events
+  WHERE action = 'LEAVE'
+),
+
+room_visits AS (
+  SELECT
+    j.event_date,
+    j.participant_name,
+    j.participant_email,
+    j.breakout_room_uuid as room_uuid,
+    j.join_time as room_join_time,
+    j.room_number,
+    (
+      SELECT MIN(l.leave_time)
+      FROM leaves l
+      WHERE l.event_date = j.event_date
+        AND l.participant_name = j.participant_name
+        AND l.breakout_room_uuid = j.breakout_room_uuid
+        AND l.leave_time > j.join_time
+    ) as room_leave_time
+  FROM joins j
+),
+
+meeting_times AS (
+  SELECT
+    event_date,
+    participant_name,
+    MIN(room_join_time) as meeting_join_time,
+    MAX(COALESCE(room_leave_time, room_join_time)) as meeting_leave_time
+  FROM room_visits
+  GROUP BY event_date, participant_name
+),
+
+with_next AS (
+  SELECT
+    rv.*,
+    LEAD(room_number) OVER (
+      PARTITION BY rv.event_date, rv.participant_name
+      ORDER BY room_number
+    ) as next_room_number
+  FROM room_visits rv
+)
+
+SELECT
+  wn.event_date as report_date,
+  wn.participant_name,
+  wn.participant_email,
+  mt.meeting_join_time,
+  mt.meeting_leave_time,
+  ROUND(TIMESTAMP_DIFF(mt.meeting_leave_time, mt.meeting_join_time, SECOND) / 60.0, 1) as meeting_duration_mins,
+  wn.room_number,
+  CONCAT('Room-', CAST(wn.room_number AS STRING)) as room_name,
+  wn.room_uuid,
+  wn.room_join_time,
+  wn.room_leave_time,
+  CASE
+    WHEN wn.room_leave_time IS NOT NULL
+    THEN ROUND(TIMESTAMP_DIFF(wn.room_leave_time, wn.room_join_time, SECOND) / 60.0, 1)
+    ELSE 0
+  END as room_duration_mins,
+  CASE
+    WHEN wn.next_room_number IS NOT NULL
+    THEN CONCAT('Room-', CAST(wn.next_room_number AS STRING))
+    ELSE 'Left Meeting'
+  END as next_room
+FROM with_next wn
+JOIN meeting_times mt
+  ON wn.event_date = mt.event_date
+ AND wn.participant_name = mt.participant_name;
+
+-- ==============================================================================
+-- STEP 3: MERGE changed rows, drop vanished visits, move the watermark
+-- ==============================================================================
+BEGIN TRANSACTION;
+
+MERGE `your-project-id.zoom_tracker.daily_reports` t
+USING changed_rows s
+ON t.report_date = s.report_date
+   AND t.participant_name = s.participant_name
+   AND t.room_number = s.room_number
+   AND t.report_date >= first_date
+-- Only rows whose values changed are rewritten
+WHEN MATCHED AND (
+     t.participant_email IS DISTINCT FROM s.participant_email
+  OR t.meeting_join_time IS DISTINCT FROM s.meeting_join_time
+  OR t.meeting_leave_time IS DISTINCT FROM s.meeting_leave_time
+  OR t.room_uuid IS DISTINCT FROM s.room_uuid
+  OR t.room_join_time IS DISTINCT FROM s.room_join_time
+  OR t.room_leave_time IS DISTINCT FROM s.room_leave_time
+  OR t.next_room IS DISTINCT FROM s.next_room
+) THEN UPDATE SET
+  participant_email = s.participant_email,
+  meeting_join_time = s.meeting_join_time,
+  meeting_leave_time = s.meeting_leave_time,
+  meeting_duration_mins = s.meeting_duration_mins,
+  room_name = s.room_name,
+  room_uuid = s.room_uuid,
+  room_join_time = s.room_join_time,
+  room_leave_time = s.room_leave_time,
+  room_duration_mins = s.room_duration_mins,
+  next_room = s.next_room,
+  created_at = CURRENT_TIMESTAMP()
+WHEN NOT MATCHED THEN INSERT (
+  report_date, participant_name, participant_email, meeting_join_time,
+  meeting_leave_time, meeting_duration_mins, room_number, room_name, room_uuid,
+  room_join_time, room_leave_time, room_duration_mins, camera_on_mins,
+  camera_off_mins, camera_percentage, next_room, created_at
+) VALUES (
+  s.report_date, s.participant_name, s.participant_email, s.meeting_join_time,
+  s.meeting_leave_time, s.meeting_duration_mins, s.room_number, s.room_name, s.room_uuid,
+  s.room_join_time, s.room_leave_time, s.room_duration_mins, 0,
+  0, 0, s.next_room, CURRENT_TIMESTAMP()
+);
+
+-- A changed participant now has fewer visits (e.g. duplicate events removed)
+DELETE FROM `your-project-id.zoom_tracker.daily_reports` t
+WHERE t.report_date >= first_date
+  AND EXISTS (
+    SELECT 1 FROM changed_participants c
+    WHERE c.event_date = t.report_date
+      AND c.participant_name = t.participant_name
+  )
+  AND NOT EXISTS (
+    SELECT 1 FROM changed_rows s
+    WHERE s.report_date = t.report_date
+      AND s.participant_name = t.participant_name
+      AND s.room_number = t.room_number
+  );
+
+MERGE `your-project-id.zoom_tracker.report_watermarks` w
+USING (SELECT 'daily_reports' as report_name) s
+ON w.report_name = s.report_name
+WHEN MATCHED AND new_watermark IS NOT NULL THEN UPDATE SET
+  watermark = GREATEST(COALESCE(w.watermark, new_watermark), new_watermark),
+  updated_at = CURRENT_TIMESTAMP()
+WHEN NOT MATCHED THEN INSERT (report_name, watermark, updated_at)
+  VALUES (s.report_name, COALESCE(new_watermark, watermark), CURRENT_TIMESTAMP());
+
+COMMIT TRANSACTION;
+
+-- ==============================================================================
+-- SUMMARY (shown in the scheduled query's job results)
+-- ==============================================================================
+SELECT
+  watermark as previous_watermark,
+  new_watermark,
+  (SELECT COUNT(*) FROM changed_participants) as participants_refreshed,
+  (SELECT COUNT(*) FROM changed_rows) as rows_merged;
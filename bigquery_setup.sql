@@ -145,3 +145,49 @@ SELECT
 FROM `your-project-id.zoom_tracker.daily_reports`
 GROUP BY 1, 2, 3
 ORDER BY report_date DESC, room_name;
+
+-- ==============================================================================
+-- STEP 6: CREATE ROOM VISITS TABLE (NEAR REAL TIME)
+-- ==============================================================================
+-- Written by the webhook when ROOM_VISITS_ENABLED=true
+-- One row per finished room visit, as soon as the LEAVE arrives
+--
+-- FIELDS:
+-- visit_date         : Date of the JOIN event
+-- room_join_time     : Entered room
+-- room_leave_time    : Left room (NULL if closed_by = 'timeout')
+-- room_duration_mins : Time in room (minutes)
+-- closed_by          : 'leave' (matched LEAVE) or 'timeout' (no LEAVE seen)
+
+CREATE TABLE IF NOT EXISTS `your-project-id.zoom_tracker.room_visits` (
+  visit_date DATE,
+  meeting_uuid STRING,
+  participant_id STRING,
+  participant_name STRING,
+  participant_email STRING,
+  room_uuid STRING,
+  room_join_time TIMESTAMP,
+  room_leave_time TIMESTAMP,
+  room_duration_mins FLOAT64,
+  closed_by STRING,
+  created_at TIMESTAMP
+)
+PARTITION BY visit_date
+CLUSTER BY participant_name;
+
+-- ==============================================================================
+-- STEP 7: CREATE REPORT WATERMARKS TABLE
+-- ==============================================================================
+-- Used by bigquery_incremental_report.sql (intraday refresh of daily_reports)
+-- One row per incremental report
+--
+-- FIELDS:
+-- report_name : 'daily_reports'
+-- watermark   : Max raw_events.inserted_at already reflected in the report
+-- updated_at  : Last run that moved the watermark
+
+CREATE TABLE IF NOT EXISTS `your-project-id.zoom_tracker.report_watermarks` (
+  report_name STRING NOT NULL,
+  watermark TIMESTAMP,
+  updated_at TIMESTAMP
+);
@@ -0,0 +1,222 @@
+"""
+BIGQUERY MICRO-BATCH WRITER
+===========================
+
+WHAT THIS DOES:
+1. Collects parsed rows (from parse_zoom_event) in memory
+2. Sends them as ONE multi-row insert_rows_json call when any limit is hit:
+   - max_rows:    number of rows waiting
+   - max_bytes:   approximate JSON size of rows waiting
+   - max_latency: seconds the oldest row has been waiting
+3. Reports per-row errors back to each caller (one Future per row)
+4. Flushes whatever is left when the process shuts down
+
+WHY:
+- A room reassignment moves hundreds of people in a couple of seconds
+- One streaming insert per event = hundreds of tiny API round trips
+- One insert per batch = far fewer calls, steadier latency at peak
+
+LIMITS (BigQuery streaming API):
+- Max 10MB per request, 500 rows per request recommended
+- Defaults stay well below both
+"""
+
+from concurrent.futures import Future
+from fast_json import encode_row
+from service_log import log
+import threading
+import time
+
+
+class BigQueryBatchWriter:
+    """
+    Per-process batching writer for one BigQuery table
+
+    USAGE:
+        writer = BigQueryBatchWriter(get_bq_client, table_id)
+        future = writer.submit(row)
+        errors = future.result()   # [] = row inserted OK
+
+    THREAD SAFETY:
+    - submit() can be called from any gunicorn thread
+    - A single background thread does all the inserts
+    """
+
+    def __init__(self, get_client, table_id, max_rows=500,
+                 max_bytes=5 * 1024 * 1024, max_latency=1.0):
+        self.get_client = get_client
+        self.table_id = table_id
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+
+        self._cond = threading.Condition()
+        self._pending = []          # [(row, future, size), ...]
+        self._pending_bytes = 0
+        self._oldest = None         # monotonic time of oldest pending row
+        self._flush_requested = False
+        self._closed = False
+
+        self.stats = {
+            'rows_submitted': 0,
+            'rows_inserted': 0,
+            'rows_failed': 0,
+            'batches': 0,
+            'api_errors': 0,
+            'last_batch_rows': 0,
+            'last_batch_ms': 0,
+        }
+
+        self._thread = threading.Thread(
+            target=self._run, name='bq-batch-writer', daemon=True
+        )
+        self._thread.start()
+
+    # --------------------------------------------------------------------------
+    # Public API
+    # --------------------------------------------------------------------------
+
+    def submit(self, row):
+        """
+        Queue one row for the next batch
+
+        RETURNS:
+        - Future whose result is the list of BigQuery errors for this row
+          ([] = inserted OK), or raises if the whole insert call failed
+        """
+        future = Future()
+        size = len(encode_row(row)) + 2  # +2 for ", " in the request
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('BigQueryBatchWriter is closed')
+
+            first = not self._pending
+            if first:
+                self._oldest = time.monotonic()
+            self._pending.append((row, future, size))
+            self._pending_bytes += size
+            self.stats['rows_submitted'] += 1
+
+            # Wake the writer to start the latency clock, or to send a full batch
+            if first or self._is_full():
+                self._cond.notify()
+
+        return future
+
+    def flush(self, timeout=None):
+        """Send everything queued so far and wait for the result"""
+        with self._cond:
+            futures = [f for _, f, _ in self._pending]
+            self._flush_requested = True
+            self._cond.notify()
+
+        for f in futures:
+            try:
+                f.result(timeout=timeout)
+            except Exception:
+                pass  # Already reported through the future
+
+    def close(self, timeout=30):
+        """Flush remaining rows and stop the background thread"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=timeout)
+
+    def get_stats(self):
+        """Snapshot of counters + current queue size (for health endpoint)"""
+        with self._cond:
+            stats = dict(self.stats)
+            stats['pending_rows'] = len(self._pending)
+            stats['pending_bytes'] = self._pending_bytes
+        return stats
+
+    # --------------------------------------------------------------------------
+    # Background thread
+    # --------------------------------------------------------------------------
+
+    def _is_full(self):
+        return (len(self._pending) >= self.max_rows
+                or self._pending_bytes >= self.max_bytes)
+
+    def _is_due(self):
+        if not self._pending:
+            return False
+        if self._closed or self._flush_requested or self._is_full():
+            return True
+        return time.monotonic() - self._oldest >= self.max_latency
+
+    def _take_batch(self):
+        """Remove up to max_rows / max_bytes worth of rows from the queue"""
+        count = 0
+        size = 0
+        for _, _, row_size in self._pending:
+            if count and (count >= self.max_rows or size + row_size > self.max_bytes):
+                break
+            count += 1
+            size += row_size
+
+        batch = self._pending[:count]
+        self._pending = self._pending[count:]
+        self._pending_bytes -= size
+        self._oldest = time.monotonic() if self._pending else None
+        if not self._pending:
+            self._flush_requested = False
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._is_due():
+                    if self._closed and not self._pending:
+                        return
+                    if self._pending:
+                        wait = self.max_latency - (time.monotonic() - self._oldest)
+                        self._cond.wait(max(wait, 0.001))
+                    else:
+                        self._cond.wait()
+                batch = self._take_batch()
+
+            self._send(batch)
+
+    def _send(self, batch):
+        """One insert_rows_json call for the whole batch"""
+        rows = [row for row, _, _ in batch]
+        start = time.monotonic()
+
+        try:
+            errors = self.get_client().insert_rows_json(self.table_id, rows)
+        except Exception as e:
+            log(f"  -> BigQuery batch Error ({len(rows)} rows): {e}", severity='ERROR',
+                key='bigquery_batch_error', table=self.table_id, rows=len(rows), error=str(e))
+            with self._cond:
+                self.stats['api_errors'] += 1
+                self.stats['rows_failed'] += len(rows)
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        # insert_rows_json returns [{'index': i, 'errors': [...]}, ...]
+        errors_by_index = {}
+        for entry in errors or []:
+            errors_by_index.setdefault(entry.get('index'), []).extend(entry.get('errors', []))
+
+        elapsed_ms = round((time.monotonic() - start) * 1000, 1)
+        failed = len(errors_by_index)
+
+        with self._cond:
+            self.stats['batches'] += 1
+            self.stats['rows_inserted'] += len(rows) - failed
+            self.stats['rows_failed'] += failed
+            self.stats['last_batch_rows'] = len(rows)
+            self.stats['last_batch_ms'] = elapsed_ms
+
+        log(f"  -> BigQuery batch: {len(rows) - failed}/{len(rows)} rows OK ({elapsed_ms} ms)",
+            severity='WARNING' if failed else 'INFO', key='bigquery_batch',
+            table=self.table_id, rows=len(rows), failed=failed, elapsed_ms=elapsed_ms)
+
+        for i, (_, future, _) in enumerate(batch):
+            future.set_result(errors_by_index.get(i, []))
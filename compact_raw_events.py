@@ -0,0 +1,291 @@
+"""
+COMPACT A FINISHED DAY OF RAW EVENTS INTO GZIP ARCHIVES
+=======================================================
+
+WHAT THIS DOES:
+1. Lists a finished day's event files under raw/<date>/
+   (per-event .json files, segments, daily file)
+2. Downloads them in parallel and streams the rows, as compact JSON lines,
+   into one or a few gzip archives:
+     gs://bucket/raw/2026-02-03/archive/events-000.jsonl.gz
+3. Uploads each archive part as soon as it is full, re-reads it and checks
+   its row count (memory holds one part, not the whole day)
+4. Writes raw/<date>/archive/index.json (parts + the files they replace)
+5. Optionally deletes the original files
+
+WHY:
+- Individual mode writes one small pretty-printed object per event
+  -> months of tiny objects make listing, load jobs and storage ops slow
+- One archive per day is a single load-job URI and a single download
+
+READING THE COMPACTED LAYOUT:
+- raw_event_reader (report builder, replays) and load_gcs_to_bigquery read
+  the archive parts and skip every file listed in index.json, so nothing is
+  read twice even when the originals are kept
+- Late events that arrive after compaction are read next to the archive;
+  running compaction again appends them as new parts
+
+LOAD MANIFEST:
+- If everything the day held was already loaded, the archive parts are added
+  to the load manifest (append-mode loads will not reload them)
+- If none of it was loaded, the parts are simply new files to load
+- If only part of it was loaded, run load_gcs_to_bigquery.py for the day
+  first (or reload it later with --replace)
+
+HOW TO RUN:
+  python compact_raw_events.py 2026-02-03
+  python compact_raw_events.py 2026-02-03 --delete-originals
+  python compact_raw_events.py --from 2026-01-01 --to 2026-01-31 --delete-originals
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from raw_event_reader import (
+    ARCHIVE_DIR, ARCHIVE_INDEX, classify_raw_object, parse_raw_object,
+    read_archive_index, select_raw_objects,
+)
+import argparse
+import gzip
+import io
+import json
+import os
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+GCP_PROJECT_ID = os.environ.get('GCP_PROJECT_ID', 'your-project-id')
+GCS_BUCKET = os.environ.get('GCS_BUCKET', 'zoom-tracker-data')
+GCS_RAW_PREFIX = os.environ.get('GCS_RAW_PREFIX', 'raw')
+
+# Start a new archive part after this many uncompressed bytes
+COMPACT_PART_MAX_BYTES = int(os.environ.get('COMPACT_PART_MAX_BYTES', 512 * 1024 * 1024))
+
+# Parallel downloads (many small objects = latency bound)
+COMPACT_WORKERS = int(os.environ.get('COMPACT_WORKERS', 32))
+
+# Days this close to today may still receive events: refused without --force
+OPEN_DATE_DAYS = 1
+
+# ==============================================================================
+# ARCHIVE WRITER
+# ==============================================================================
+
+class ArchivePart:
+    """One gzip JSON Lines part, built in memory (compressed)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.raw_bytes = 0
+        self._buffer = io.BytesIO()
+        self._gzip = gzip.GzipFile(fileobj=self._buffer, mode='wb')
+
+    def write(self, row):
+        line = (json.dumps(row) + '\n').encode('utf-8')
+        self._gzip.write(line)
+        self.rows += 1
+        self.raw_bytes += len(line)
+
+    def finish(self):
+        self._gzip.close()
+        return self._buffer.getvalue()
+
+
+def upload_part(bucket, part):
+    """Upload a part (never overwrites) and check its row count"""
+    data = part.finish()
+    blob = bucket.blob(part.name)
+    blob.upload_from_string(data, content_type='application/gzip', if_generation_match=0)
+
+    stored = bucket.blob(part.name).download_as_bytes()
+    rows = sum(1 for line in gzip.decompress(stored).splitlines() if line.strip())
+    if rows != part.rows:
+        raise RuntimeError(f"{part.name}: wrote {part.rows} rows, read back {rows}")
+
+    print(f"  -> {part.name}: {rows} rows, {len(data) / 1024 / 1024:.1f} MB "
+          f"({part.raw_bytes / 1024 / 1024:.1f} MB uncompressed)")
+    return rows
+
+# ==============================================================================
+# COMPACTION
+# ==============================================================================
+
+def iter_downloads(blobs, workers):
+    """
+    (blob, bytes) in name order, downloaded in parallel
+
+    Works in windows of workers * 8 objects so memory stays bounded
+    """
+    window = workers * 8
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i in range(0, len(blobs), window):
+            chunk = blobs[i:i + window]
+            yield from zip(chunk, pool.map(lambda b: b.download_as_bytes(), chunk))
+
+
+def iter_part_numbers(start, blobs):
+    """Part numbers from start on, skipping names left by an interrupted run"""
+    n = start
+    while True:
+        if f"{ARCHIVE_DIR}/events-{n:03d}.jsonl.gz" not in blobs:
+            yield n
+        n += 1
+
+
+def update_load_manifest(bucket, target_date, loadable, parts):
+    """
+    Mark the new parts as loaded if everything they contain was loaded
+
+    RETURNS:
+    - True if the manifest was updated
+    """
+    from load_gcs_to_bigquery import read_manifest, write_manifest
+
+    loaded = read_manifest(bucket, target_date)
+    missing = [name for name, gen in loadable.items() if loaded.get(name) != gen]
+    if len(missing) == len(loadable):
+        # None of it loaded yet: the parts will be loaded like any new file
+        return False
+    if missing:
+        print(f"  WARNING: {len(missing)} compacted files were not loaded yet; "
+              f"reload {target_date} with load_gcs_to_bigquery.py --replace")
+        return False
+
+    for name in parts:
+        loaded[name] = bucket.get_blob(name).generation
+    write_manifest(bucket, target_date, loaded)
+    return True
+
+
+def compact_date(bucket, target_date, delete_originals=False,
+                 part_max_bytes=COMPACT_PART_MAX_BYTES, workers=COMPACT_WORKERS):
+    """
+    Compact one day's event files into gzip archive parts
+
+    HOW:
+    - Sources = every event file not already in the archive, including the
+      daily file (a copy of the segments, never read while they exist)
+    - Rows are read with the same rules as every other reader, so the archive
+      holds exactly the rows a load job or report would have seen
+    - Each part is uploaded and verified as soon as it is full, then dropped
+    - index.json is written only after all parts are verified: an interrupted
+      run leaves the day readable as before (its parts are not in the index,
+      readers ignore them and the next run picks new part names)
+
+    RETURNS:
+    - {'date', 'sources', 'rows', 'parts', 'deleted'}
+    """
+    base = f"{GCS_RAW_PREFIX}/{target_date}/"
+    blobs = {b.name[len(base):]: b for b in bucket.list_blobs(prefix=base)}
+    index = read_archive_index(bucket, GCS_RAW_PREFIX, target_date) if ARCHIVE_INDEX in blobs else {}
+    index.setdefault('parts', {})
+    index.setdefault('sources', [])
+
+    done = set(index['sources'])
+    sources = sorted(
+        rel for rel in blobs
+        if rel not in done and classify_raw_object(rel) in ('json', 'segment', 'daily')
+    )
+    result = {'date': target_date, 'sources': len(sources), 'rows': 0, 'parts': [], 'deleted': 0}
+    if not sources:
+        print(f"  {target_date}: nothing to compact")
+        return result
+
+    # Files a reader would use right now (and what the load manifest tracks)
+    to_read = select_raw_objects(sources)
+    loadable = {blobs[rel].name: blobs[rel].generation for rel in to_read}
+    print(f"  {target_date}: {len(sources)} files to compact ({len(to_read)} to read)")
+
+    part_numbers = iter_part_numbers(len(index['parts']), blobs)
+    part = None
+    parts = {}      # name -> rows, for parts already uploaded and verified
+    for blob, data in iter_downloads([blobs[rel] for rel in to_read], workers):
+        for row in parse_raw_object(blob.name, data):
+            if part is None:
+                part = ArchivePart(f"{base}{ARCHIVE_DIR}/events-{next(part_numbers):03d}.jsonl.gz")
+            part.write(row)
+            result['rows'] += 1
+            if part.raw_bytes >= part_max_bytes:
+                parts[part.name] = upload_part(bucket, part)
+                part = None
+    if part is not None:
+        parts[part.name] = upload_part(bucket, part)
+
+    archived = sum(parts.values())
+    if archived != result['rows']:
+        raise RuntimeError(f"{target_date}: read {result['rows']} rows, archived {archived}")
+
+    for name, rows in parts.items():
+        index['parts'][name[len(base):]] = rows
+    index['sources'] = sorted(done | set(sources))
+    index['updated_at'] = datetime.utcnow().isoformat()
+    bucket.blob(base + ARCHIVE_INDEX).upload_from_string(
+        json.dumps(index), content_type='application/json'
+    )
+    result['parts'] = list(parts)
+
+    if update_load_manifest(bucket, target_date, loadable, result['parts']):
+        print(f"  -> Load manifest updated ({len(parts)} parts marked as loaded)")
+
+    if delete_originals:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda rel: blobs[rel].delete(), sources))
+        result['deleted'] = len(sources)
+        print(f"  -> Deleted {len(sources)} original files")
+
+    return result
+
+# ==============================================================================
+# MAIN
+# ==============================================================================
+
+def date_range(date_from, date_to):
+    start = datetime.strptime(date_from, '%Y-%m-%d').date()
+    end = datetime.strptime(date_to, '%Y-%m-%d').date()
+    return [str(start + timedelta(days=i)) for i in range((end - start).days + 1)]
+
+
+def main():
+    from google.cloud import storage
+
+    parser = argparse.ArgumentParser(description='Compact raw event files into daily gzip archives')
+    parser.add_argument('date', nargs='?', help='Date to compact (YYYY-MM-DD)')
+    parser.add_argument('--from', dest='date_from', help='First date of a range')
+    parser.add_argument('--to', dest='date_to', help='Last date of a range')
+    parser.add_argument('--delete-originals', action='store_true',
+                        help='Delete the compacted files after the archive is verified')
+    parser.add_argument('--force', action='store_true',
+                        help='Also compact dates that may still receive events')
+    args = parser.parse_args()
+
+    if args.date_from or args.date_to:
+        if not (args.date_from and args.date_to):
+            parser.error('--from and --to go together')
+        dates = date_range(args.date_from, args.date_to)
+    elif args.date:
+        dates = [args.date]
+    else:
+        parser.error('give a date or --from/--to')
+
+    open_from = str(datetime.utcnow().date() - timedelta(days=OPEN_DATE_DAYS))
+    if not args.force and any(d >= open_from for d in dates):
+        parser.error(f'dates from {open_from} may still receive events (use --force)')
+
+    print("=" * 60)
+    print("COMPACT RAW EVENTS")
+    print("=" * 60)
+
+    bucket = storage.Client(project=GCP_PROJECT_ID).bucket(GCS_BUCKET)
+    total_rows = total_sources = 0
+    for d in dates:
+        result = compact_date(bucket, d, delete_originals=args.delete_originals)
+        total_rows += result['rows']
+        total_sources += result['sources']
+
+    print("=" * 60)
+    print(f"DONE! {total_sources} files -> {total_rows} archived rows")
+    print("=" * 60)
+
+if __name__ == '__main__':
+    main()
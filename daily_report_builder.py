@@ -0,0 +1,303 @@
+"""
+BUILD DAILY REPORT LOCALLY (PYTHON SESSIONIZATION)
+==================================================
+
+WHAT THIS DOES:
+1. Reads one day's raw webhook events (GCS or a local directory), plus the
+   next day's folder for events delivered after midnight
+2. Matches each JOIN with its LEAVE using ONE sort + sweep per participant
+3. Builds the same daily_reports rows as bigquery_daily_report.sql
+4. Loads them in bulk (one load job replacing the day's partition)
+
+WHY (vs. bigquery_daily_report.sql):
+- The SQL finds each LEAVE with a correlated subquery per JOIN row
+  -> quadratic per participant, and scans raw_events twice
+- Here: sort each participant's events once, walk them backwards keeping
+  "next LEAVE per room" -> O(n log n) for the whole day
+- Load jobs are free, streaming/DML are not
+
+SAME RULES AS THE SQL:
+- Only events whose event_date = report date
+- JOINs need a breakout_room_uuid, LEAVEs don't
+- room_number: JOIN order per participant_name (1, 2, 3...)
+- room_leave_time: first LEAVE of the same room strictly after the JOIN
+- Durations: whole seconds / 60, rounded to 1 decimal (half away from zero)
+
+HOW TO RUN:
+  python daily_report_builder.py 2026-02-03                   # GCS -> BigQuery
+  python daily_report_builder.py 2026-02-03 --local ./raw/2026-02-03
+  python daily_report_builder.py 2026-02-03 --output report.jsonl   # no load
+"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, ROUND_HALF_UP
+from raw_event_reader import iter_gcs_day_events, iter_local_day_events
+import argparse
+import json
+import os
+import time
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+GCP_PROJECT_ID = os.environ.get('GCP_PROJECT_ID', 'your-project-id')
+GCS_BUCKET = os.environ.get('GCS_BUCKET', 'zoom-tracker-data')
+GCS_RAW_PREFIX = os.environ.get('GCS_RAW_PREFIX', 'raw')
+BQ_DATASET = os.environ.get('BQ_DATASET', 'zoom_tracker')
+BQ_REPORT_TABLE = os.environ.get('BQ_REPORT_TABLE', 'daily_reports')
+
+# daily_reports columns (same as bigquery_setup.sql)
+REPORT_SCHEMA = [
+    ('report_date', 'DATE'),
+    ('participant_name', 'STRING'),
+    ('participant_email', 'STRING'),
+    ('meeting_join_time', 'TIMESTAMP'),
+    ('meeting_leave_time', 'TIMESTAMP'),
+    ('meeting_duration_mins', 'FLOAT64'),
+    ('room_number', 'INT64'),
+    ('room_name', 'STRING'),
+    ('room_uuid', 'STRING'),
+    ('room_join_time', 'TIMESTAMP'),
+    ('room_leave_time', 'TIMESTAMP'),
+    ('room_duration_mins', 'FLOAT64'),
+    ('camera_on_mins', 'FLOAT64'),
+    ('camera_off_mins', 'FLOAT64'),
+    ('camera_percentage', 'FLOAT64'),
+    ('next_room', 'STRING'),
+    ('created_at', 'TIMESTAMP'),
+]
+
+# NOT NULL in bigquery_setup.sql (a load must not relax them to NULLABLE)
+REPORT_REQUIRED = {'report_date'}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# ==============================================================================
+# TIME HELPERS
+# ==============================================================================
+
+def to_micros(value):
+    """
+    ISO timestamp string -> microseconds since epoch (int)
+
+    WHY INTEGERS:
+    - Exact comparisons and TIMESTAMP_DIFF-style truncation, no float drift
+    - Timestamps without a timezone are UTC (same as BigQuery)
+    """
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    delta = dt - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_micros(micros):
+    """Microseconds since epoch -> ISO string BigQuery accepts for TIMESTAMP"""
+    return (EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def diff_mins(end_us, start_us):
+    """ROUND(TIMESTAMP_DIFF(end, start, SECOND) / 60.0, 1)"""
+    seconds = (end_us - start_us) // 1_000_000
+    mins = Decimal(repr(seconds / 60.0))
+    return float(mins.quantize(Decimal('0.1'), rounding=ROUND_HALF_UP))
+
+# ==============================================================================
+# SESSIONIZATION
+# ==============================================================================
+
+def group_by_participant(events, target_date):
+    """
+    Keep the events the SQL would use, grouped by participant_name
+
+    RETURNS:
+    - {participant_name: [(ts_us, is_join, room_uuid, email), ...]}
+    """
+    by_participant = {}
+
+    for e in events:
+        if str(e.get('event_date', ''))[:10] != target_date:
+            continue
+
+        action = e.get('action')
+        room = e.get('breakout_room_uuid') or ''
+        if action == 'JOIN':
+            if not room:
+                continue
+            is_join = 1
+        elif action == 'LEAVE':
+            is_join = 0
+        else:
+            continue
+
+        ts = e.get('event_timestamp')
+        name = e.get('participant_name')
+        if not ts or name is None:
+            # NULL names never match the SQL's final JOIN on participant_name
+            continue
+
+        by_participant.setdefault(name, []).append(
+            (to_micros(ts), is_join, room, e.get('participant_email') or '')
+        )
+
+    return by_participant
+
+
+def sessionize_participant(events):
+    """
+    Match JOINs with LEAVEs for one participant (single sort + sweep)
+
+    HOW:
+    - Sort by (time, is_join): at equal times LEAVE sorts before JOIN
+    - Walk backwards keeping the earliest LEAVE seen so far per room
+    - Walking backwards, a JOIN is reached before any LEAVE at the same time,
+      so it only sees LEAVEs strictly after it (same as `leave_time > join_time`)
+
+    RETURNS:
+    - [(join_us, leave_us or None, room_uuid, email), ...] in visit order
+    """
+    events.sort(key=lambda e: (e[0], e[1]))
+
+    next_leave = {}
+    visits = []
+    for ts, is_join, room, email in reversed(events):
+        if is_join:
+            visits.append((ts, next_leave.get(room), room, email))
+        elif room:
+            next_leave[room] = ts
+
+    visits.reverse()
+    return visits
+
+
+def build_daily_report(events, target_date, created_at=None):
+    """
+    Build daily_reports rows for one date from raw event rows
+
+    RETURNS:
+    - List of row dicts, ordered by participant_name, room_number
+    """
+    created_at = created_at or datetime.now(timezone.utc).isoformat()
+    by_participant = group_by_participant(events, target_date)
+
+    rows = []
+    for name in sorted(by_participant):
+        visits = sessionize_participant(by_participant[name])
+        if not visits:
+            continue
+
+        meeting_join = min(join for join, _, _, _ in visits)
+        meeting_leave = max(leave if leave is not None else join for join, leave, _, _ in visits)
+        meeting_mins = diff_mins(meeting_leave, meeting_join)
+
+        for number, (join, leave, room, email) in enumerate(visits, start=1):
+            rows.append({
+                'report_date': target_date,
+                'participant_name': name,
+                'participant_email': email,
+                'meeting_join_time': from_micros(meeting_join),
+                'meeting_leave_time': from_micros(meeting_leave),
+                'meeting_duration_mins': meeting_mins,
+                'room_number': number,
+                'room_name': f"Room-{number}",
+                'room_uuid': room,
+                'room_join_time': from_micros(join),
+                'room_leave_time': from_micros(leave) if leave is not None else None,
+                'room_duration_mins': diff_mins(leave, join) if leave is not None else 0,
+                # Camera data (placeholder - updated by update_camera_data.py)
+                'camera_on_mins': 0,
+                'camera_off_mins': 0,
+                'camera_percentage': 0,
+                'next_room': f"Room-{number + 1}" if number < len(visits) else 'Left Meeting',
+                'created_at': created_at,
+            })
+
+    return rows
+
+# ==============================================================================
+# BIGQUERY LOAD
+# ==============================================================================
+
+def load_report_rows(rows, target_date):
+    """
+    Replace the day's partition of daily_reports with these rows
+
+    HOW:
+    - ONE load job into daily_reports$YYYYMMDD with WRITE_TRUNCATE
+    - Same effect as the SQL's DELETE + INSERT, but free and atomic
+    """
+    from google.cloud import bigquery
+
+    client = bigquery.Client(project=GCP_PROJECT_ID)
+    partition = target_date.replace('-', '')
+    table_id = f"{GCP_PROJECT_ID}.{BQ_DATASET}.{BQ_REPORT_TABLE}${partition}"
+
+    job_config = bigquery.LoadJobConfig(
+        schema=[
+            bigquery.SchemaField(name, field_type,
+                                 mode='REQUIRED' if name in REPORT_REQUIRED else 'NULLABLE')
+            for name, field_type in REPORT_SCHEMA
+        ],
+        source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+    )
+
+    load_job = client.load_table_from_json(rows, table_id, job_config=job_config)
+    load_job.result()
+    print(f"Loaded {load_job.output_rows} rows into {table_id}")
+    return load_job.output_rows
+
+# ==============================================================================
+# MAIN
+# ==============================================================================
+
+def read_events(target_date, local_dir=None):
+    """
+    Events for one date from a local directory or GCS
+
+    raw/<date>/ and raw/<date+1>/ (late deliveries); group_by_participant
+    keeps only event_date = target_date
+    """
+    if local_dir:
+        return list(iter_local_day_events(local_dir, target_date))
+
+    from google.cloud import storage
+    bucket = storage.Client(project=GCP_PROJECT_ID).bucket(GCS_BUCKET)
+    return list(iter_gcs_day_events(bucket, GCS_RAW_PREFIX, target_date))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build daily_reports rows locally')
+    parser.add_argument('date', help='Report date (YYYY-MM-DD)')
+    parser.add_argument('--local', help='Read events from this directory instead of GCS')
+    parser.add_argument('--output', help='Write rows to this JSONL file instead of BigQuery')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BUILD DAILY REPORT (LOCAL)")
+    print("=" * 60)
+    print(f"Date: {args.date}")
+
+    start = time.time()
+    events = read_events(args.date, args.local)
+    print(f"Read {len(events)} events ({time.time() - start:.1f}s)")
+
+    start = time.time()
+    rows = build_daily_report(events, args.date)
+    print(f"Built {len(rows)} report rows ({time.time() - start:.2f}s)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+        print(f"Written to {args.output}")
+    else:
+        load_report_rows(rows, args.date)
+
+    print("=" * 60)
+    print("DONE!")
+    print("=" * 60)
+
+if __name__ == '__main__':
+    main()
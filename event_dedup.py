@@ -0,0 +1,185 @@
+"""
+WEBHOOK RETRY DEDUPLICATION (BOUNDED IDEMPOTENCY CACHE)
+=======================================================
+
+WHAT THIS DOES:
+1. Builds a deterministic event ID from the payload:
+     event + event_ts + meeting uuid + participant + breakout room
+   -> a Zoom retry of the same delivery gets the SAME ID
+2. Keeps recently seen IDs in a bounded in-memory cache (LRU + TTL)
+3. The webhook drops an event whose ID is already cached, before any
+   GCS / BigQuery write
+4. At startup the cache can be warmed from the last N minutes of GCS
+   segments (segments mode)
+
+WHY:
+- event_id used to be uuid4(): every Zoom retry became a new raw_events row
+  and a new GCS object, and JOIN/LEAVE matching paired against the copies
+- During retry storms most writes were duplicates
+
+LIMITS:
+- The cache is per container; the deterministic event_id still helps across
+  containers (individual GCS files get the same name, duplicates can be
+  removed with SELECT DISTINCT / QUALIFY on event_id)
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+import json
+import threading
+import time
+import uuid
+
+# Namespace for uuid5 event IDs (fixed: IDs must be stable across deploys)
+EVENT_ID_NAMESPACE = uuid.UUID('7b1f2c4e-5a6d-4e8f-9c0b-1d2e3f4a5b6c')
+
+
+def idempotency_key(data):
+    """
+    Deterministic event ID for a Zoom webhook payload
+
+    FIELDS:
+    - event, event_ts, meeting uuid, participant (user ID, name as fallback),
+      breakout room uuid
+    - No event_ts: the whole payload is used instead (two different events
+      must not share an ID)
+
+    RETURNS:
+    - UUID string (same shape as the old uuid4 event_id)
+    """
+    obj = data.get('payload', {}).get('object', {})
+    participant = obj.get('participant', {})
+
+    if data.get('event_ts'):
+        parts = [
+            data.get('event', ''),
+            str(data.get('event_ts')),
+            obj.get('uuid', ''),
+            participant.get('user_id') or participant.get('participant_user_id')
+            or participant.get('user_name', ''),
+            obj.get('breakout_room_uuid', ''),
+        ]
+        name = '|'.join(str(p) for p in parts)
+    else:
+        name = json.dumps(data, sort_keys=True)
+
+    return str(uuid.uuid5(EVENT_ID_NAMESPACE, name))
+
+
+class EventDedupCache:
+    """
+    Bounded set of recently seen event IDs
+
+    USAGE:
+        if cache.check_and_add(event_id):
+            return  # duplicate
+        ...
+        cache.forget(event_id)  # the event was NOT accepted (e.g. 503)
+    """
+
+    def __init__(self, max_entries=100000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()   # event_id -> first seen (monotonic)
+
+        self.stats = {
+            'checked': 0,
+            'duplicates_dropped': 0,
+            'evicted': 0,           # Dropped because the cache was full
+            'expired': 0,
+            'warmed': 0,
+        }
+
+    def check_and_add(self, event_id):
+        """
+        RETURNS:
+        - True: seen within ttl (duplicate, drop it)
+        - False: new, now remembered
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.stats['checked'] += 1
+            self._expire(now)
+
+            if event_id in self._seen:
+                self.stats['duplicates_dropped'] += 1
+                return True
+
+            self._remember(event_id, now)
+            return False
+
+    def forget(self, event_id):
+        with self._lock:
+            self._seen.pop(event_id, None)
+
+    def warm(self, event_ids):
+        """Remember IDs written before this process started"""
+        seen_at = time.monotonic()
+        with self._lock:
+            for event_id in event_ids:
+                if event_id not in self._seen:
+                    self._remember(event_id, seen_at)
+                    self.stats['warmed'] += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self._seen)
+            stats['max_entries'] = self.max_entries
+        return stats
+
+    def _remember(self, event_id, seen_at):
+        self._seen[event_id] = seen_at
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+            self.stats['evicted'] += 1
+
+    def _expire(self, now):
+        # Insertion order = age order
+        cutoff = now - self.ttl
+        while self._seen:
+            event_id, seen_at = next(iter(self._seen.items()))
+            if seen_at >= cutoff:
+                break
+            self._seen.popitem(last=False)
+            self.stats['expired'] += 1
+
+
+def recent_event_ids(bucket, prefix, minutes):
+    """
+    Event IDs written to GCS segments in the last `minutes` minutes
+
+    HOW:
+    - Lists today's (and, near midnight, yesterday's) raw/<date>/segments/
+      (a few objects per writer per day) and reads the segments created
+      inside the window line by line
+
+    WHY SEGMENTS ONLY:
+    - Per-event files are named by event_id (random), so the recent ones
+      can only be found by listing the whole day: O(the day's events) on
+      every cold start. Individual mode has no warm-up
+
+    RETURNS:
+    - List of event IDs, oldest segments first
+    """
+    from raw_event_reader import classify_raw_object, parse_raw_object
+
+    now = datetime.now(timezone.utc)
+    since = now - timedelta(minutes=minutes)
+    dates = sorted({since.strftime('%Y-%m-%d'), now.strftime('%Y-%m-%d')})
+
+    recent = []
+    for date_str in dates:
+        base = f"{prefix}/{date_str}/"
+        for blob in bucket.list_blobs(prefix=f"{base}segments/"):
+            if blob.time_created and blob.time_created >= since:
+                recent.append((blob.time_created, base, blob))
+
+    event_ids = []
+    for _, base, blob in sorted(recent, key=lambda item: item[0]):
+        if classify_raw_object(blob.name[len(base):]) == 'segment':
+            rows = parse_raw_object(blob.name, blob.download_as_bytes())
+            event_ids.extend(r['event_id'] for r in rows if r.get('event_id'))
+    return event_ids
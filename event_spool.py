@@ -0,0 +1,414 @@
+"""
+DURABLE LOCAL SPOOL + REPLAYER (ACCEPT ON DISK, DELIVER LATER)
+==============================================================
+
+WHAT THIS DOES:
+1. append(row): writes the event as one JSON line to the current spool
+   segment (spool-000000000001.jsonl, ...) and returns once it is on disk
+   - Group commit: one fsync every fsync_interval covers every event
+     appended meanwhile (SPOOL_FSYNC_MS)
+   - Segments rotate at segment_max_bytes
+2. A replayer thread reads the spool from its checkpoint and delivers each
+   event to every sink (GCS, BigQuery, local store...):
+   - batches of replay_batch lines, sent by replay_workers threads; a
+     smaller batch waits up to batch_wait seconds for more lines
+   - a failed (event, sink) pair is retried with exponential backoff; the
+     checkpoint only moves past a batch once every sink accepted it
+   - checkpoint.json = (segment, byte offset), so a restart resumes where
+     it stopped; fully replayed segments are deleted
+3. get_stats(): spool size, replay lag (bytes and seconds), retries
+
+WHY:
+- Sink errors were printed and the event was lost (Zoom still got 200)
+- A hanging sink held the request thread
+- Acceptance now costs a local append + a shared fsync
+
+DELIVERY:
+- At least once: an event whose batch was interrupted is sent again after
+  a restart (GCS individual files get the same name, BigQuery rows carry
+  the same deterministic event_id)
+
+NOTE:
+- The spool directory must survive restarts (local disk, mounted volume);
+  on Cloud Run without a volume /tmp is memory and goes with the instance
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from fast_json import encode_row, loads
+from service_log import log
+import json
+import os
+import threading
+import time
+
+SEGMENT_PREFIX = 'spool-'
+SEGMENT_SUFFIX = '.jsonl'
+CHECKPOINT_FILE = 'checkpoint.json'
+
+
+class EventSpool:
+    """
+    Append-only segmented log with a background replayer
+
+    USAGE:
+        spool = EventSpool('/var/spool/zoom', [('gcs', write_gcs), ('bigquery', write_bq)])
+        spool.append(row)   # durable when it returns
+        spool.close()       # fsync, give the replayer drain_timeout to catch up
+
+    SINKS:
+    - (name, function) pairs; a function returns True/False, or a Future
+      whose result is a list of errors ([] = OK)
+    - A Future must resolve only once the row is stored (e.g. the GCS
+      segment uploaded), since the checkpoint then moves past the row
+    - flushers: called once a batch is handed to the sinks, so buffering
+      writers send it now instead of at their age limit; with batch_wait
+      that is at most one flush per batch_wait while the spool is quiet
+    """
+
+    def __init__(self, directory, sinks, segment_max_bytes=64 * 1024 * 1024,
+                 fsync_interval=0.01, replay_batch=500, replay_workers=8,
+                 max_backoff=60.0, flushers=(), batch_wait=0.0):
+        self.directory = directory
+        self.sinks = list(sinks)
+        self.flushers = list(flushers)
+        self.batch_wait = batch_wait
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_interval = fsync_interval
+        self.replay_batch = replay_batch
+        self.max_backoff = max_backoff
+        os.makedirs(directory, exist_ok=True)
+
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stop = threading.Event()
+
+        # Segment sizes: closed segments from disk, the open one as written
+        self._sizes = {seq: os.path.getsize(self.segment_path(seq)) for seq in self._list_segments()}
+        self._checkpoint = self._read_checkpoint()
+
+        # Always start a fresh segment: never append after a torn last line
+        self._seq = max(self._sizes, default=0) + 1
+        self._file = open(self.segment_path(self._seq), 'ab')
+        self._sizes[self._seq] = 0
+        self._written = (self._seq, 0)
+        self._durable = (self._seq, 0)
+        if self._checkpoint is None:
+            self._checkpoint = (min(self._sizes), 0)
+
+        self._replay_head = None    # inserted_at of the oldest event not yet delivered
+        self._partial_since = None  # monotonic time a short batch was first seen
+        self.stats = {
+            'appended': 0,
+            'fsyncs': 0,
+            'replayed': 0,
+            'replay_retries': 0,
+            'corrupt_lines': 0,
+        }
+
+        self._pool = ThreadPoolExecutor(max_workers=replay_workers, thread_name_prefix='spool-replay')
+        self._threads = [threading.Thread(target=self._replay_loop, name='spool-replayer', daemon=True)]
+        if fsync_interval > 0:
+            self._threads.append(threading.Thread(target=self._fsync_loop, name='spool-fsync', daemon=True))
+        for t in self._threads:
+            t.start()
+
+    # --------------------------------------------------------------------------
+    # Append side
+    # --------------------------------------------------------------------------
+
+    def append(self, row):
+        """
+        Write one event; returns once it is durable (fsync_interval > 0) or
+        handed to the OS (fsync_interval = 0)
+
+        Raises on disk errors or after close(): the caller must not ack
+        """
+        line = encode_row(row) + b'\n'
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('EventSpool is closed')
+
+            self._file.write(line)
+            size = self._written[1] + len(line)
+            self._written = (self._seq, size)
+            self._sizes[self._seq] = size
+            self.stats['appended'] += 1
+            position = self._written
+
+            if self.fsync_interval <= 0:
+                self._file.flush()
+                self._durable = position
+                self._cond.notify_all()
+            else:
+                while self._durable < position and not self._closed:
+                    self._cond.wait()
+
+            if size >= self.segment_max_bytes:
+                self._rotate()
+        return True
+
+    def _sync(self):
+        """flush + fsync the open segment (lock held)"""
+        if self._durable < self._written:
+            self._file.flush()
+            if self.fsync_interval > 0:
+                os.fsync(self._file.fileno())
+                self.stats['fsyncs'] += 1
+            self._durable = self._written
+            self._cond.notify_all()
+
+    def _rotate(self):
+        """Close the full segment, open the next one (lock held)"""
+        self._sync()
+        self._file.close()
+        self._seq += 1
+        self._file = open(self.segment_path(self._seq), 'ab')
+        self._sizes[self._seq] = 0
+        self._written = self._durable = (self._seq, 0)
+
+    def _fsync_loop(self):
+        while not self._stop.wait(self.fsync_interval):
+            with self._cond:
+                if not self._file.closed:
+                    self._sync()
+
+    # --------------------------------------------------------------------------
+    # Replay side
+    # --------------------------------------------------------------------------
+
+    def _read_batch(self):
+        """
+        Up to replay_batch complete lines after the checkpoint
+
+        RETURNS:
+        - (lines, end position); end position = next segment start when the
+          checkpoint's segment is finished
+        """
+        with self._cond:
+            seq, offset = self._checkpoint
+            durable = self._durable
+            later = sorted(s for s in self._sizes if s > seq)
+
+        if (seq, offset) >= durable:
+            return [], None
+
+        limit = durable[1] if seq == durable[0] else None
+        lines = []
+        try:
+            with open(self.segment_path(seq), 'rb') as f:
+                f.seek(offset)
+                while len(lines) < self.replay_batch:
+                    if limit is not None and offset >= limit:
+                        break
+                    line = f.readline()
+                    if not line.endswith(b'\n'):
+                        break  # Torn last line of a crashed segment, or not written yet
+                    lines.append(line)
+                    offset += len(line)
+        except FileNotFoundError:
+            pass
+
+        if not lines and seq < durable[0] and later:
+            # Segment finished: move on (and drop the replayed file)
+            return [], (later[0], 0)
+        return lines, (seq, offset)
+
+    def _deliver(self, rows):
+        """
+        Send rows to every sink, retrying failed (row, sink) pairs
+
+        RETURNS:
+        - True once all succeeded, False if stopped first
+        """
+        pending = [(row, name, write) for row in rows for name, write in self.sinks]
+        attempt = 0
+        while pending:
+            # Batched sinks return Futures: submit the whole batch, then wait
+            results = list(self._pool.map(self._call_sink, pending))
+            self._flush_sinks()
+            results = [self._resolve(result, p[1]) for p, result in zip(pending, results)]
+            pending = [p for p, ok in zip(pending, results) if not ok]
+            if not pending:
+                return True
+
+            with self._cond:
+                self.stats['replay_retries'] += len(pending)
+            failed = sorted({name for _, name, _ in pending})
+            backoff = min(self.max_backoff, 0.5 * 2 ** attempt)
+            log(f"  -> Spool replay: {len(pending)} writes failed ({', '.join(failed)}), "
+                f"retry in {backoff:.1f}s", severity='WARNING', key='spool_retry',
+                failed=len(pending), sinks=failed, backoff=backoff)
+            attempt += 1
+            if self._stop.wait(backoff):
+                return False
+        return True
+
+    def _flush_sinks(self):
+        for flush in self.flushers:
+            try:
+                flush()
+            except Exception as e:
+                log(f"  -> Spool replay flush Error: {e}", severity='ERROR',
+                    key='spool_replay_error', error=str(e))
+
+    @staticmethod
+    def _call_sink(item):
+        row, name, write = item
+        try:
+            return write(row)
+        except Exception as e:
+            log(f"  -> Spool replay {name} Error: {e}", severity='ERROR',
+                key='spool_replay_error', sink=name, error=str(e))
+            return False
+
+    @staticmethod
+    def _resolve(result, name):
+        """Sink result -> True/False (waits for Futures)"""
+        if not isinstance(result, Future):
+            return bool(result)
+        try:
+            return not result.result(timeout=120)
+        except Exception as e:
+            log(f"  -> Spool replay {name} Error: {e}", severity='ERROR',
+                key='spool_replay_error', sink=name, error=str(e))
+            return False
+
+    def _should_wait(self, lines):
+        """Hold a short batch until it fills or is batch_wait old"""
+        if (self.batch_wait <= 0 or len(lines) >= self.replay_batch
+                or self._closed or self._stop.is_set()):
+            self._partial_since = None
+            return False
+        now = time.monotonic()
+        if self._partial_since is None:
+            self._partial_since = now
+        if now - self._partial_since < self.batch_wait:
+            return True
+        self._partial_since = None
+        return False
+
+    def _replay_loop(self):
+        while True:
+            lines, end = self._read_batch()
+            if lines and self._should_wait(lines):
+                with self._cond:
+                    self._cond.wait(0.2)
+                continue
+
+            if not lines:
+                if end is not None:
+                    self._advance(end)
+                    continue
+                if self._stop.is_set():
+                    return
+                with self._cond:
+                    self._replay_head = None
+                    self._cond.wait(0.2)
+                continue
+
+            rows = []
+            for line in lines:
+                try:
+                    rows.append(loads(line))
+                except ValueError:
+                    self.stats['corrupt_lines'] += 1
+            if rows:
+                self._replay_head = rows[0].get('inserted_at')
+
+            if not self._deliver(rows):
+                return  # Stopped mid-batch: replayed again after restart
+            with self._cond:
+                self.stats['replayed'] += len(rows)
+            self._advance(end)
+
+    def _advance(self, position):
+        """Move the checkpoint, delete segments that are fully replayed"""
+        with self._cond:
+            old_seq = self._checkpoint[0]
+            self._checkpoint = position
+            done = [s for s in self._sizes if old_seq <= s < position[0]]
+            for s in done:
+                del self._sizes[s]
+        for s in done:
+            try:
+                os.remove(self.segment_path(s))
+            except FileNotFoundError:
+                pass
+        self._write_checkpoint(position)
+
+    # --------------------------------------------------------------------------
+    # Files
+    # --------------------------------------------------------------------------
+
+    def segment_path(self, seq):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{seq:012d}{SEGMENT_SUFFIX}")
+
+    def _list_segments(self):
+        seqs = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                seqs.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(seqs)
+
+    def _read_checkpoint(self):
+        try:
+            with open(os.path.join(self.directory, CHECKPOINT_FILE)) as f:
+                data = json.load(f)
+            return (data['segment'], data['offset'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_checkpoint(self, position):
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'segment': position[0], 'offset': position[1],
+                       'updated_at': datetime.utcnow().isoformat()}, f)
+        os.replace(tmp, path)
+
+    # --------------------------------------------------------------------------
+    # Stats / shutdown
+    # --------------------------------------------------------------------------
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            seq, offset = self._checkpoint
+            stats['segments'] = len(self._sizes)
+            stats['spool_bytes'] = sum(self._sizes.values())
+            stats['lag_bytes'] = sum(size for s, size in self._sizes.items() if s >= seq) - offset
+            stats['checkpoint'] = {'segment': seq, 'offset': offset}
+            head = self._replay_head
+
+        stats['lag_secs'] = 0.0
+        if head:
+            try:
+                stats['lag_secs'] = round((datetime.utcnow() - datetime.fromisoformat(head)).total_seconds(), 1)
+            except ValueError:
+                pass
+        return stats
+
+    def close(self, drain_timeout=10):
+        """
+        Stop accepting, fsync, let the replayer catch up for drain_timeout
+        seconds; anything left is replayed after the next start
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._sync()
+            self._cond.notify_all()
+
+        deadline = time.monotonic() + drain_timeout
+        while time.monotonic() < deadline and self.get_stats()['lag_bytes'] > 0:
+            time.sleep(0.05)
+
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=5)
+        self._pool.shutdown(wait=False)
+        with self._cond:
+            self._file.close()
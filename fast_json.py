@@ -0,0 +1,65 @@
+"""
+FAST JSON ENCODE / DECODE FOR THE WEBHOOK HOT PATH
+==================================================
+
+WHAT THIS DOES:
+- dumps()/loads() backed by orjson when it is installed, the standard json
+  module otherwise (same compact output either way)
+- EncodedRow: a row dict that remembers its JSON bytes, so the row is
+  serialized ONCE per event whatever the number of sinks
+
+WHY:
+- Per event the webhook used to parse the body, dump it again for
+  raw_payload, dump the row again (indent=2) for GCS and once more to size
+  it for the BigQuery batch
+- orjson encodes/decodes several times faster and returns bytes directly
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # Optional: fall back to the standard library
+    orjson = None
+
+
+def dumps(obj):
+    """Compact JSON as UTF-8 bytes"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass  # e.g. integers above 64 bits: let json handle it
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads(data):
+    """Parse JSON from bytes or str (raises ValueError on bad input)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class EncodedRow(dict):
+    """
+    Row dict with cached JSON bytes
+
+    The cache is filled on first use; do not modify the row after that
+    """
+
+    __slots__ = ('_encoded',)
+
+    @property
+    def encoded(self):
+        try:
+            return self._encoded
+        except AttributeError:
+            self._encoded = dumps(self)
+            return self._encoded
+
+
+def encode_row(row):
+    """JSON bytes for a row (cached for EncodedRow, encoded for plain dicts)"""
+    if isinstance(row, EncodedRow):
+        return row.encoded
+    return dumps(row)
@@ -0,0 +1,327 @@
+"""
+GCS ROLLING SEGMENT WRITER (APPEND-ONLY JSONL)
+==============================================
+
+WHAT THIS DOES:
+1. Buffers events as JSON lines in memory (one buffer per event date)
+2. When the buffer reaches max_bytes or max_age seconds, writes it to GCS as
+   ONE new, immutable, sequence-numbered segment:
+     gs://bucket/raw/2026-02-03/segments/<writer>-000001.jsonl
+     gs://bucket/raw/2026-02-03/segments/<writer>-000002.jsonl.gz  (gzip on)
+3. Optionally composes a finished day's segments into the daily file:
+     gs://bucket/raw/2026-02-03/events.jsonl
+
+WHY (vs. the old write_to_gcs):
+- Old way downloaded the whole day's events.jsonl, appended ONE line, and
+  uploaded it all again -> cost grew with the file size (O(n^2) per day)
+- Concurrent gunicorn threads overwrote each other's appends
+- Segments are never rewritten: each upload is new data only, and every
+  writer (container) has its own ID so names never collide
+
+LOADING:
+- Segments are plain JSON Lines, load_gcs_to_bigquery loads them directly
+"""
+
+from concurrent.futures import Future
+from datetime import datetime
+from fast_json import encode_row
+from service_log import log
+import gzip
+import os
+import socket
+import threading
+import time
+import uuid
+
+# GCS compose accepts at most 32 source objects per call
+COMPOSE_MAX_SOURCES = 32
+
+SEGMENTS_DIR = 'segments'
+
+
+class GcsSegmentWriter:
+    """
+    Buffers JSON lines and uploads them as immutable segments
+
+    USAGE:
+        writer = GcsSegmentWriter(get_bucket, 'raw')
+        future = writer.append(row)   # cheap, in memory
+        future.result()               # [] once the row's segment is in GCS
+        writer.close()                # upload what is left (call on shutdown)
+    """
+
+    def __init__(self, get_bucket, prefix, max_bytes=8 * 1024 * 1024,
+                 max_age=60.0, use_gzip=False, requeue_failed=True):
+        self.get_bucket = get_bucket
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.use_gzip = use_gzip
+        # True: a failed upload's lines go back into the buffer (callers
+        # that ignore the Future); False: the Future fails, the caller
+        # (e.g. the spool replayer) sends the lines again
+        self.requeue_failed = requeue_failed
+
+        # Unique per process: containers never write the same segment name
+        self.writer_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+        self._lock = threading.Lock()
+        self._buffers = {}      # date -> {'lines': [bytes, ...], 'bytes': n, 'started': t, 'futures': [Future]}
+        self._seq = 0
+        self._closed = False
+        self._stop = threading.Event()
+
+        self.stats = {
+            'lines_buffered': 0,
+            'segments_written': 0,
+            'bytes_written': 0,
+            'upload_errors': 0,
+        }
+
+        self._thread = threading.Thread(
+            target=self._run, name='gcs-segment-writer', daemon=True
+        )
+        self._thread.start()
+
+    # --------------------------------------------------------------------------
+    # Public API
+    # --------------------------------------------------------------------------
+
+    def append(self, event_data, date_str=None):
+        """
+        Add one event to the current segment for its date
+
+        Uploads inline only when this line fills the segment (max_bytes)
+
+        RETURNS:
+        - Future shared by the segment's lines; its result is [] once the
+          segment is uploaded. A failed upload keeps it pending while the
+          lines are retried (requeue_failed), or fails it
+        """
+        line = encode_row(event_data) + b'\n'
+        date_str = date_str or datetime.utcnow().strftime('%Y-%m-%d')
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('GcsSegmentWriter is closed')
+            buf = self._new_buffer(date_str)
+            buf['lines'].append(line)
+            buf['bytes'] += len(line)
+            future = buf['futures'][0]
+            self.stats['lines_buffered'] += 1
+            ready = self._take(date_str) if buf['bytes'] >= self.max_bytes else None
+
+        if ready:
+            self._upload(*ready)
+        return future
+
+    def flush(self):
+        """Upload every non-empty buffer now"""
+        with self._lock:
+            ready = [self._take(d) for d in list(self._buffers)]
+        for item in ready:
+            self._upload(*item)
+
+    def close(self):
+        """Upload remaining lines and stop the age-check thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['buffered_bytes'] = sum(b['bytes'] for b in self._buffers.values())
+        return stats
+
+    # --------------------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------------------
+
+    def _new_buffer(self, date_str):
+        """A date's buffer, created with its Future if needed (lock held)"""
+        buf = self._buffers.get(date_str)
+        if buf is None:
+            buf = self._buffers[date_str] = {
+                'lines': [], 'bytes': 0, 'started': time.monotonic(), 'futures': [Future()]
+            }
+        return buf
+
+    def _take(self, date_str):
+        """Remove a date's buffer and give it the next sequence number (lock held)"""
+        buf = self._buffers.pop(date_str)
+        self._seq += 1
+        return date_str, self._seq, buf['lines'], buf['futures']
+
+    def segment_path(self, date_str, seq):
+        ext = 'jsonl.gz' if self.use_gzip else 'jsonl'
+        return f"{self.prefix}/{date_str}/{SEGMENTS_DIR}/{self.writer_id}-{seq:06d}.{ext}"
+
+    def _upload(self, date_str, seq, lines, futures):
+        path = self.segment_path(date_str, seq)
+        data = b''.join(lines)
+        if self.use_gzip:
+            data = gzip.compress(data)
+
+        try:
+            blob = self.get_bucket().blob(path)
+            # if_generation_match=0: create only, never overwrite a segment
+            blob.upload_from_string(
+                data,
+                content_type='application/gzip' if self.use_gzip else 'application/x-ndjson',
+                if_generation_match=0
+            )
+        except Exception as e:
+            log(f"  -> GCS segment Error ({path}): {e}", severity='ERROR',
+                key='gcs_segment_error', path=path, error=str(e))
+            with self._lock:
+                self.stats['upload_errors'] += 1
+            if not self.requeue_failed:
+                for future in futures:
+                    future.set_exception(e)
+                return False
+            # Put the lines back so the next flush retries them
+            with self._lock:
+                buf = self._new_buffer(date_str)
+                buf['lines'][:0] = lines
+                buf['bytes'] += sum(len(line) for line in lines)
+                buf['futures'].extend(futures)
+            return False
+
+        with self._lock:
+            self.stats['segments_written'] += 1
+            self.stats['bytes_written'] += len(data)
+        log(f"  -> GCS segment: {path} ({len(lines)} events)", key='gcs_segment',
+            path=path, events=len(lines))
+        for future in futures:
+            future.set_result([])
+        return True
+
+    def _run(self):
+        """Upload buffers that are older than max_age"""
+        while not self._stop.wait(min(self.max_age, 1.0)):
+            now = time.monotonic()
+            with self._lock:
+                ready = [
+                    self._take(d) for d, buf in list(self._buffers.items())
+                    if now - buf['started'] >= self.max_age
+                ]
+            for item in ready:
+                self._upload(*item)
+
+
+def compose_daily_file(bucket, prefix, date_str, delete_segments=False):
+    """
+    Combine a finished day's segments into one daily file
+
+    HOW:
+    - GCS compose joins objects server-side (no download/upload)
+    - Max 32 sources per call, so we chain: daily = daily + next 31 segments
+    - Plain segments -> events.jsonl, gzip segments -> events.jsonl.gz
+      (concatenated gzip members are still one valid gzip file)
+    - delete_segments: readers switch to the daily file, so the load
+      manifest must know it holds loaded rows (see mark_daily_files_loaded);
+      segments are kept if only some of them were loaded
+
+    RETURNS:
+    - List of daily file paths written
+    """
+    segments = sorted(
+        (b for b in bucket.list_blobs(prefix=f"{prefix}/{date_str}/{SEGMENTS_DIR}/")),
+        key=lambda b: b.name
+    )
+
+    written = []
+    composed = []
+    for ext in ('jsonl', 'jsonl.gz'):
+        sources = [b for b in segments if b.name.endswith('.' + ext)]
+        if not sources:
+            continue
+
+        target = bucket.blob(f"{prefix}/{date_str}/events.{ext}")
+        target.content_type = 'application/gzip' if ext.endswith('.gz') else 'application/x-ndjson'
+
+        target.compose(sources[:COMPOSE_MAX_SOURCES])
+        for i in range(COMPOSE_MAX_SOURCES, len(sources), COMPOSE_MAX_SOURCES - 1):
+            target.compose([target] + sources[i:i + COMPOSE_MAX_SOURCES - 1])
+
+        log(f"  -> Composed {len(sources)} segments into {target.name}", key='gcs_compose',
+            path=target.name, segments=len(sources))
+        written.append(target.name)
+        composed.extend(sources)
+
+    if delete_segments and composed:
+        if mark_daily_files_loaded(bucket, date_str, composed, written):
+            for b in composed:
+                b.delete()
+        else:
+            log(f"  WARNING: only some segments of {date_str} were loaded; segments kept. "
+                f"Run load_gcs_to_bigquery.py for the day first", severity='WARNING',
+                key='gcs_compose_partial', date=date_str)
+
+    return written
+
+
+def mark_daily_files_loaded(bucket, date_str, segments, daily_files):
+    """
+    Load manifest for a day whose segments are about to be deleted
+
+    - No segment loaded yet: the daily files are simply new files to load
+    - All loaded: the daily files are recorded as loaded (same rows)
+    - Some loaded: False, deleting would load those rows a second time
+
+    RETURNS:
+    - True if the segments can be deleted
+    """
+    from load_gcs_to_bigquery import read_manifest, write_manifest
+
+    loaded = read_manifest(bucket, date_str)
+    done = [b for b in segments if loaded.get(b.name) == b.generation]
+    if not done:
+        return True
+    if len(done) < len(segments):
+        return False
+
+    for name in daily_files:
+        loaded[name] = bucket.get_blob(name).generation
+    write_manifest(bucket, date_str, loaded)
+    log(f"  -> Load manifest updated ({len(daily_files)} daily file(s) marked as loaded)",
+        key='gcs_compose_manifest', date=date_str)
+    return True
+
+# ==============================================================================
+# MAIN
+# ==============================================================================
+
+def main():
+    """
+    Compose a finished day's segments into the daily file
+
+    HOW TO RUN:
+      python gcs_segment_writer.py 2026-02-03
+      python gcs_segment_writer.py 2026-02-03 --delete-segments
+    """
+    from google.cloud import storage
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python gcs_segment_writer.py YYYY-MM-DD [--delete-segments]")
+        return
+
+    client = storage.Client(project=os.environ.get('GCP_PROJECT_ID', 'your-project-id'))
+    bucket = client.bucket(os.environ.get('GCS_BUCKET', 'zoom-tracker-data'))
+    prefix = os.environ.get('GCS_RAW_PREFIX', 'raw')
+
+    written = compose_daily_file(
+        bucket, prefix, sys.argv[1],
+        delete_segments='--delete-segments' in sys.argv[2:]
+    )
+    if not written:
+        print("No segments found")
+
+if __name__ == '__main__':
+    main()
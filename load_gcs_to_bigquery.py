@@ -6,21 +6,40 @@ WHAT THIS DOES:
 1. Reads raw JSON files from GCS bucket
 2. Loads them into BigQuery raw_events table
 3. Batch loading is FREE (vs streaming which costs $$$)
+4. Remembers what was loaded (manifest), so re-runs never double rows
 
 WHEN TO USE:
 - If streaming insert fails
 - To reload historical data
 - To process large batches
 
+MODES:
+- Append (default): loads only objects not in the date's manifest
+- Replace (--replace): rewrites the dates' rows with everything in GCS
+  (raw/<date>/ plus late deliveries in raw/<date+1>/), through staging
+  tables and one DELETE + INSERT transaction. Use this for days that were
+  also streamed, the dates end up exactly what is in GCS. Files of the
+  touched folders that were never loaded also get their rows for other
+  dates (e.g. a Zoom retry for the day before, delivered after midnight).
+
 HOW TO RUN:
   python load_gcs_to_bigquery.py 2026-02-03
+  python load_gcs_to_bigquery.py --from 2026-02-01 --to 2026-02-28
+  python load_gcs_to_bigquery.py --from 2026-02-01 --to 2026-02-28 --replace
+  python load_gcs_to_bigquery.py --list
+  python load_gcs_to_bigquery.py --list --sizes
+  python load_gcs_to_bigquery.py --list --sizes --refresh-index
 """
 
 from google.cloud import bigquery
 from google.cloud import storage
+from google.api_core.exceptions import NotFound
+from raw_event_reader import ARCHIVE_INDEX, next_date, read_archive_index, select_raw_objects
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
 import os
-import sys
-from datetime import datetime, date
+from datetime import datetime, date, timedelta, timezone
 
 # ==============================================================================
 # CONFIGURATION
@@ -32,11 +51,316 @@ GCS_RAW_PREFIX = os.environ.get('GCS_RAW_PREFIX', 'raw')
 BQ_DATASET = os.environ.get('BQ_DATASET', 'zoom_tracker')
 BQ_TABLE = os.environ.get('BQ_TABLE', 'raw_events')
 
+# Where load manifests live: gs://bucket/manifests/<dataset>.<table>/<date>.json
+GCS_MANIFEST_PREFIX = os.environ.get('GCS_MANIFEST_PREFIX', 'manifests')
+
+# Load jobs run at the same time
+LOAD_PARALLEL_JOBS = int(os.environ.get('LOAD_PARALLEL_JOBS', 4))
+
+# BigQuery accepts at most 10,000 source URIs per load job
+MAX_URIS_PER_JOB = 10000
+
+# Append mode: start a new job after this many bytes (spreads big ranges
+# over parallel jobs)
+LOAD_JOB_TARGET_BYTES = int(os.environ.get('LOAD_JOB_TARGET_BYTES', 1024 ** 3))
+
+# Cached per-date object counts / sizes (see update_date_index)
+GCS_DATE_INDEX_PATH = os.environ.get('GCS_DATE_INDEX_PATH', 'manifests/date_index.json')
+
+# Dates this close to today may still receive files: always recounted
+OPEN_DATE_DAYS = 1
+
+# ==============================================================================
+# MANIFEST
+# ==============================================================================
+
+def manifest_path(target_date):
+    return f"{GCS_MANIFEST_PREFIX}/{BQ_DATASET}.{BQ_TABLE}/{target_date}.json"
+
+def read_manifest(bucket, target_date):
+    """
+    Objects already loaded for a date
+
+    RETURNS:
+    - {object_name: generation}
+    """
+    try:
+        data = bucket.blob(manifest_path(target_date)).download_as_text()
+    except NotFound:
+        return {}
+    return json.loads(data).get('objects', {})
+
+def write_manifest(bucket, target_date, objects):
+    body = {
+        'table': f"{GCP_PROJECT_ID}.{BQ_DATASET}.{BQ_TABLE}",
+        'date': target_date,
+        'objects': objects,
+        'updated_at': datetime.utcnow().isoformat(),
+    }
+    bucket.blob(manifest_path(target_date)).upload_from_string(
+        json.dumps(body), content_type='application/json'
+    )
+
+# ==============================================================================
+# PLANNING
+# ==============================================================================
+
+def list_raw_objects(bucket, target_date):
+    """
+    Event files for a date, in every raw layout
+
+    RETURNS:
+    - {object_name: (generation, size)} (see raw_event_reader.select_raw_objects;
+      compacted days return their archive parts)
+    """
+    base = f"{GCS_RAW_PREFIX}/{target_date}/"
+    blobs = {
+        b.name[len(base):]: b
+        for b in bucket.list_blobs(prefix=base, fields='items(name,generation,size),nextPageToken')
+    }
+    index = read_archive_index(bucket, GCS_RAW_PREFIX, target_date) if ARCHIVE_INDEX in blobs else {}
+    return {
+        blobs[rel].name: (blobs[rel].generation, blobs[rel].size or 0)
+        for rel in select_raw_objects(blobs, index)
+    }
+
+def plan_date(bucket, target_date, replace=False):
+    """
+    What to load for one date
+
+    WHY EXPLICIT OBJECT NAMES (not wildcards):
+    - A wildcard also picks up files written after we listed, which would
+      then be missing from the manifest and loaded again next time
+
+    RETURNS:
+    - {'date', 'objects': {name: generation} for all current objects,
+       'load': names to load (all of them with replace),
+       'new': names not in the manifest, 'sizes': {name: bytes}}
+    """
+    listed = list_raw_objects(bucket, target_date)
+    objects = {name: gen for name, (gen, _) in listed.items()}
+    loaded = read_manifest(bucket, target_date)
+    new = sorted(name for name, gen in objects.items() if loaded.get(name) != gen)
+    return {
+        'date': target_date,
+        'objects': objects,
+        'load': sorted(objects) if replace else new,
+        'new': new,
+        'sizes': {name: size for name, (_, size) in listed.items()},
+    }
+
+def make_jobs(plans, table_id, key='load'):
+    """
+    Group the plans into load jobs
+
+    - Dates share jobs, up to 10,000 URIs / LOAD_JOB_TARGET_BYTES each
+    - key: which names of each plan to load ('load', or 'new' for the
+      replace staging of files never loaded)
+
+    RETURNS:
+    - [{'dates': [...], 'names': [...], 'uris': [...], 'bytes': n, 'table': id}]
+    """
+    jobs = []
+    current = None
+    for plan in plans:
+        for name in plan[key]:
+            if (current is None or len(current['uris']) >= MAX_URIS_PER_JOB
+                    or current['bytes'] >= LOAD_JOB_TARGET_BYTES):
+                current = {'dates': [], 'names': [], 'uris': [], 'bytes': 0, 'table': table_id}
+                jobs.append(current)
+            current['bytes'] += plan['sizes'][name]
+            if plan['date'] not in current['dates']:
+                current['dates'].append(plan['date'])
+            current['names'].append(name)
+            current['uris'].append(f"gs://{GCS_BUCKET}/{name}")
+    return jobs
+
 # ==============================================================================
 # MAIN FUNCTION
 # ==============================================================================
 
-def load_gcs_to_bigquery(target_date):
+def run_load_job(client, job):
+    """Start one load job and wait for it"""
+    job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        # Schema auto-detection or use existing table schema
+        autodetect=False,
+    )
+    load_job = client.load_table_from_uri(job['uris'], job['table'], job_config=job_config)
+    load_job.result()
+    return load_job.output_rows
+
+def run_load_jobs(client, jobs):
+    """
+    Run load jobs, LOAD_PARALLEL_JOBS at a time
+
+    RETURNS:
+    - [(job, rows, error)] (error is None for the jobs that succeeded)
+    """
+    def run(job):
+        try:
+            return job, run_load_job(client, job), None
+        except Exception as e:
+            return job, None, e
+
+    print(f"Starting {len(jobs)} load job(s), {LOAD_PARALLEL_JOBS} at a time...")
+    with ThreadPoolExecutor(max_workers=LOAD_PARALLEL_JOBS) as pool:
+        results = list(pool.map(run, jobs))
+
+    for job, rows, error in results:
+        if error is not None:
+            print(f"  ERROR ({', '.join(job['dates'])}): {error}")
+        else:
+            print(f"  Loaded {rows} rows ({len(job['uris'])} files) -> {job['table']}")
+    return results
+
+def replace_dates(client, bucket, dates, plans):
+    """
+    Rewrite the dates' rows with everything GCS has for them
+
+    HOW:
+    - Load raw/<date>/ and raw/<date+1>/ of every date into a staging table,
+      and the files not loaded before into a second one (load jobs are free)
+    - One transaction: DELETE the dates' rows, INSERT the staged rows of
+      those dates, INSERT the never-loaded files' rows of other dates
+    - Every listed file of those folders is now in the table: each folder's
+      manifest lists them all
+
+    WHY NOT A PARTITION LOAD (table$YYYYMMDD + WRITE_TRUNCATE):
+    - BigQuery rejects files holding rows of another date, and raw/<date>/
+      holds late deliveries for the day before
+    - It wiped the date's late rows loaded from raw/<date+1>/, while that
+      folder's manifest still said they were loaded
+
+    RETURNS:
+    - Rows inserted
+    """
+    table_id = f"{GCP_PROJECT_ID}.{BQ_DATASET}.{BQ_TABLE}"
+    folders = set(dates) | {next_date(d) for d in dates}
+    plans = [p for p in plans if p['date'] in folders]
+
+    suffix = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    staging = {key: f"{table_id}__replace_{suffix}_{key}" for key in ('load', 'new')}
+    jobs = make_jobs(plans, staging['load'], 'load') + make_jobs(plans, staging['new'], 'new')
+
+    schema = client.get_table(table_id).schema
+    try:
+        for staging_id in staging.values():
+            table = bigquery.Table(staging_id, schema=schema)
+            table.expires = datetime.now(timezone.utc) + timedelta(days=1)
+            client.create_table(table)
+
+        results = run_load_jobs(client, jobs)
+        failed = sorted({d for job, _, error in results if error is not None for d in job['dates']})
+        if failed:
+            raise RuntimeError(f"Staging failed for {', '.join(failed)}, nothing replaced")
+
+        query = f"""
+        BEGIN TRANSACTION;
+
+        DELETE FROM `{table_id}` WHERE event_date IN UNNEST(@dates);
+
+        INSERT INTO `{table_id}`
+        SELECT * FROM `{staging['load']}` WHERE event_date IN UNNEST(@dates);
+
+        INSERT INTO `{table_id}`
+        SELECT * FROM `{staging['new']}`
+        WHERE event_date IS NULL OR event_date NOT IN UNNEST(@dates);
+
+        COMMIT TRANSACTION;
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ArrayQueryParameter('dates', 'DATE', dates)
+        ])
+        query_job = client.query(query, job_config=job_config)
+        query_job.result()
+        inserted = sum(
+            j.num_dml_affected_rows or 0
+            for j in client.list_jobs(parent_job=query_job)
+            if j.statement_type == 'INSERT'
+        )
+    finally:
+        for staging_id in staging.values():
+            client.delete_table(staging_id, not_found_ok=True)
+
+    for plan in plans:
+        write_manifest(bucket, plan['date'], plan['objects'])
+
+    print(f"  Replaced {len(dates)} date(s): {inserted} rows inserted")
+    return inserted
+
+def load_date_range(dates, replace=False, force=False):
+    """
+    Load several dates from GCS to BigQuery
+
+    WHY:
+    - Idempotent: the manifest remembers which objects (and generations)
+      were loaded, a re-run only loads what is new
+    - Cheap: few load jobs for many dates, run in parallel
+    - Replace: see replace_dates, the DELETE only scans the dates' partitions
+
+    NOTE:
+    - Dates with no files in GCS are skipped, even with replace (never
+      empty a partition just because the bucket has nothing for it)
+
+    RETURNS:
+    - Total rows loaded
+    """
+    client = bigquery.Client(project=GCP_PROJECT_ID)
+    bucket = storage.Client(project=GCP_PROJECT_ID).bucket(GCS_BUCKET)
+
+    # Replace also reads the next day's folder (late deliveries)
+    folders = sorted(set(dates) | {next_date(d) for d in dates}) if replace else dates
+    with ThreadPoolExecutor(max_workers=LOAD_PARALLEL_JOBS) as pool:
+        plans = list(pool.map(lambda d: plan_date(bucket, d, replace or force), folders))
+
+    for plan in plans:
+        print(f"  {plan['date']}: {len(plan['objects'])} objects, {len(plan['load'])} to load "
+              f"({format_bytes(sum(plan['sizes'][n] for n in plan['load']))})")
+
+    plans_by_date = {p['date']: p for p in plans}
+    if replace:
+        dates = [d for d in dates if plans_by_date[d]['objects']]
+        if not dates:
+            print("Nothing to replace")
+            return 0
+        total = replace_dates(client, bucket, dates, plans)
+    else:
+        jobs = make_jobs(plans, f"{GCP_PROJECT_ID}.{BQ_DATASET}.{BQ_TABLE}")
+        if not jobs:
+            print("Nothing new to load")
+            return 0
+
+        total = 0
+        loaded_names = {}   # date -> objects of the jobs that succeeded
+        failed_dates = set()
+        for job, rows, error in run_load_jobs(client, jobs):
+            if error is not None:
+                failed_dates.update(job['dates'])
+                continue
+            total += rows
+            names = set(job['names'])
+            for d in job['dates']:
+                loaded_names.setdefault(d, set()).update(
+                    name for name in plans_by_date[d]['load'] if name in names)
+
+        # Manifest = objects of every job that succeeded (a failed job's
+        # files are not in the table and are loaded next run)
+        for d in sorted(loaded_names):
+            plan = plans_by_date[d]
+            loaded = read_manifest(bucket, d)
+            loaded.update({name: plan['objects'][name] for name in sorted(loaded_names[d])})
+            write_manifest(bucket, d, loaded)
+
+        if failed_dates:
+            raise RuntimeError(f"Load failed for {', '.join(sorted(failed_dates))}")
+
+    destination_table = client.get_table(f"{GCP_PROJECT_ID}.{BQ_DATASET}.{BQ_TABLE}")
+    print(f"Table now has {destination_table.num_rows} total rows")
+    return total
+
+def load_gcs_to_bigquery(target_date, replace=False):
     """
     Load JSON files from GCS to BigQuery
 
@@ -47,96 +371,147 @@ def load_gcs_to_bigquery(target_date):
 
     HOW:
     - Uses BigQuery load job
-    - Reads JSON files from GCS path
-    - Auto-detects schema (or uses existing table schema)
+    - Reads JSON files and JSONL segments from GCS path
+    - Only files not loaded before (manifest), unless replace=True
     """
     print(f"Loading data for {target_date}")
+    print(f"Source: gs://{GCS_BUCKET}/{GCS_RAW_PREFIX}/{target_date}/")
+    print(f"Destination: {GCP_PROJECT_ID}.{BQ_DATASET}.{BQ_TABLE}")
 
-    # GCS path pattern
-    gcs_uri = f"gs://{GCS_BUCKET}/{GCS_RAW_PREFIX}/{target_date}/*.json"
-    print(f"Source: {gcs_uri}")
+    return load_date_range([target_date], replace=replace)
 
-    # BigQuery table
-    table_id = f"{GCP_PROJECT_ID}.{BQ_DATASET}.{BQ_TABLE}"
-    print(f"Destination: {table_id}")
+def list_date_prefixes(bucket):
+    """
+    Dates that have a raw/<date>/ folder
 
-    # Create BigQuery client
-    client = bigquery.Client(project=GCP_PROJECT_ID)
+    HOW:
+    - delimiter='/' makes GCS return the "folders" under raw/ instead of
+      every object -> cost grows with the number of days, not events
+    """
+    iterator = bucket.list_blobs(prefix=f"{GCS_RAW_PREFIX}/", delimiter='/')
 
-    # Configure load job
-    job_config = bigquery.LoadJobConfig(
-        source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
-        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,  # Append to existing
-        # Schema auto-detection or use existing table schema
-        autodetect=False,
-    )
+    dates = set()
+    for page in iterator.pages:
+        for prefix in page.prefixes:
+            # raw/2026-02-03/ -> 2026-02-03
+            date_str = prefix[len(GCS_RAW_PREFIX) + 1:].rstrip('/')
+            if len(date_str) == 10 and date_str[4] == '-':
+                dates.add(date_str)
 
-    # Start load job
-    print("Starting load job...")
-    load_job = client.load_table_from_uri(
-        gcs_uri,
-        table_id,
-        job_config=job_config
-    )
+    return sorted(dates)
 
-    # Wait for completion
-    load_job.result()
+def count_date_objects(bucket, target_date):
+    """Object count and total bytes for one date (event files only)"""
+    listed = list_raw_objects(bucket, target_date)
+    return {
+        'objects': len(listed),
+        'bytes': sum(size for _, size in listed.values()),
+        'counted_at': datetime.utcnow().isoformat(),
+    }
 
-    # Get results
-    destination_table = client.get_table(table_id)
-    print(f"Loaded {load_job.output_rows} rows")
-    print(f"Table now has {destination_table.num_rows} total rows")
+def update_date_index(bucket, refresh=False):
+    """
+    Cached per-date object counts and sizes
 
-    return load_job.output_rows
+    HOW:
+    - Dates come from the cheap delimiter listing
+    - Finished dates are counted once and kept in the index object
+      (gs://bucket/manifests/date_index.json)
+    - Dates within OPEN_DATE_DAYS of today, new dates, or all dates with
+      refresh=True are (re)counted
+
+    RETURNS:
+    - {date: {'objects', 'bytes', 'counted_at'}}
+    """
+    blob = bucket.blob(GCS_DATE_INDEX_PATH)
+    try:
+        index = {} if refresh else json.loads(blob.download_as_text())
+    except NotFound:
+        index = {}
+
+    dates = list_date_prefixes(bucket)
+    open_from = str(datetime.utcnow().date() - timedelta(days=OPEN_DATE_DAYS))
+    stale = [d for d in dates if d not in index or d >= open_from]
+
+    if stale:
+        with ThreadPoolExecutor(max_workers=LOAD_PARALLEL_JOBS) as pool:
+            for d, counts in zip(stale, pool.map(lambda d: count_date_objects(bucket, d), stale)):
+                index[d] = counts
+
+    index = {d: index[d] for d in dates}
+    if stale or refresh:
+        blob.upload_from_string(json.dumps(index, sort_keys=True), content_type='application/json')
+    return index
 
 def list_available_dates():
     """List dates that have data in GCS"""
     client = storage.Client(project=GCP_PROJECT_ID)
     bucket = client.bucket(GCS_BUCKET)
+    return list_date_prefixes(bucket)
 
-    # List all prefixes under /raw/
-    blobs = bucket.list_blobs(prefix=f"{GCS_RAW_PREFIX}/")
-
-    dates = set()
-    for blob in blobs:
-        # Extract date from path: raw/2026-02-03/event.json
-        parts = blob.name.split('/')
-        if len(parts) >= 2:
-            date_str = parts[1]
-            if len(date_str) == 10 and date_str[4] == '-':
-                dates.add(date_str)
-
-    return sorted(dates)
+def format_bytes(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
 
 # ==============================================================================
 # MAIN
 # ==============================================================================
 
+def date_range(date_from, date_to):
+    start = datetime.strptime(date_from, '%Y-%m-%d').date()
+    end = datetime.strptime(date_to, '%Y-%m-%d').date()
+    return [str(start + timedelta(days=i)) for i in range((end - start).days + 1)]
+
 def main():
     print("=" * 60)
     print("LOAD GCS DATA TO BIGQUERY")
     print("=" * 60)
 
-    if len(sys.argv) > 1:
-        if sys.argv[1] == '--list':
-            # List available dates
-            print("\nAvailable dates in GCS:")
-            dates = list_available_dates()
-            for d in dates:
+    parser = argparse.ArgumentParser(description='Load raw events from GCS to BigQuery')
+    parser.add_argument('date', nargs='?', help='Date to load (YYYY-MM-DD), default today')
+    parser.add_argument('--list', action='store_true', help='List dates available in GCS')
+    parser.add_argument('--sizes', action='store_true',
+                        help='With --list: show file counts and sizes (cached index, needs write access)')
+    parser.add_argument('--refresh-index', action='store_true',
+                        help='With --list --sizes: recount every date, not just new/open ones')
+    parser.add_argument('--from', dest='date_from', help='Range start (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='date_to', help='Range end (YYYY-MM-DD), default = --from')
+    parser.add_argument('--replace', action='store_true',
+                        help='Rewrite each date partition with everything in GCS')
+    parser.add_argument('--force', action='store_true',
+                        help='Ignore the manifest and append every file again')
+    args = parser.parse_args()
+
+    if args.list:
+        print("\nAvailable dates in GCS:")
+        if not args.sizes:
+            # Folder listing only: one page per 1,000 days, read-only
+            for d in list_available_dates():
                 print(f"  - {d}")
             return
-        else:
-            # Load specific date
-            target_date = sys.argv[1]
+
+        # With cached object counts / sizes
+        bucket = storage.Client(project=GCP_PROJECT_ID).bucket(GCS_BUCKET)
+        index = update_date_index(bucket, refresh=args.refresh_index)
+        for d, info in index.items():
+            print(f"  - {d}  {info['objects']:>8} files  {format_bytes(info['bytes']):>10}")
+        return
+
+    if args.date_from:
+        dates = date_range(args.date_from, args.date_to or args.date_from)
     else:
-        # Default to today
-        target_date = date.today().strftime('%Y-%m-%d')
+        # Specific date, default to today
+        dates = [args.date or date.today().strftime('%Y-%m-%d')]
 
-    print(f"\nDate: {target_date}")
+    print(f"\nDates: {dates[0]}" + (f" -> {dates[-1]} ({len(dates)} days)" if len(dates) > 1 else ""))
+    print(f"Mode: {'replace partitions' if args.replace else 'append new files'}")
     print()
 
     try:
-        rows = load_gcs_to_bigquery(target_date)
+        rows = load_date_range(dates, replace=args.replace, force=args.force)
         print()
         print("=" * 60)
         print(f"SUCCESS! Loaded {rows} rows")
@@ -0,0 +1,246 @@
+"""
+LOCAL EVENT STORE (SQLITE / DUCKDB) FOR ON-PREM AND DEV
+=======================================================
+
+WHAT THIS DOES:
+1. Keeps raw_events in an embedded database file instead of BigQuery:
+   - SQLite (built in) or DuckDB (pip install duckdb)
+   - Table clustered by (event_date, event_id): each day's rows sit together
+     like a date partition, and a repeated event_id is ignored
+2. Exposes insert_rows_json(table, rows) like bigquery.Client, so the
+   webhook reuses BigQueryBatchWriter for multi-row inserts
+3. Builds daily_reports locally with the same rules as the SQL
+   (daily_report_builder) and replaces the day's rows in one transaction
+
+WHY:
+- On-prem and dev deployments get ingestion and reports without GCP and
+  without streaming-insert costs
+- Same webhook, same batching: backends can be compared on the same
+  workload (benchmark_webhook.py with EVENT_SINKS=local)
+
+HOW TO RUN:
+  # Webhook: EVENT_SINKS=local LOCAL_STORE_PATH=./zoom_events.db
+  python local_event_store.py report 2026-02-03
+  python local_event_store.py report 2026-02-03 --output report.jsonl
+  python local_event_store.py ingest ./raw/2026-02-03          # raw files -> store
+  python local_event_store.py stats
+"""
+
+from daily_report_builder import REPORT_SCHEMA, build_daily_report
+import argparse
+import json
+import os
+import threading
+import time
+
+LOCAL_STORE_PATH = os.environ.get('LOCAL_STORE_PATH', 'zoom_events.db')
+LOCAL_STORE_BACKEND = os.environ.get('LOCAL_STORE_BACKEND', 'sqlite')
+
+# raw_events columns (same as bigquery_setup.sql)
+EVENT_COLUMNS = (
+    'event_id', 'event_date', 'event_type', 'event_timestamp', 'meeting_id',
+    'meeting_uuid', 'participant_id', 'participant_name', 'participant_email',
+    'breakout_room_uuid', 'action', 'raw_payload', 'inserted_at', 'gcs_path',
+)
+
+REPORT_COLUMNS = tuple(name for name, _ in REPORT_SCHEMA)
+
+# SQLite and DuckDB both accept this DDL (types map to TEXT / DOUBLE / BIGINT)
+SQL_TYPES = {'STRING': 'TEXT', 'DATE': 'TEXT', 'TIMESTAMP': 'TEXT', 'FLOAT64': 'DOUBLE', 'INT64': 'BIGINT'}
+
+
+class LocalEventStore:
+    """
+    Embedded raw_events + daily_reports tables
+
+    USAGE:
+        store = LocalEventStore('zoom_events.db')          # or backend='duckdb'
+        store.insert_rows_json('raw_events', rows)         # -> [] (no errors)
+        store.build_report('2026-02-03')
+    """
+
+    def __init__(self, path=LOCAL_STORE_PATH, backend=LOCAL_STORE_BACKEND):
+        self.path = path
+        self.backend = backend
+        self._lock = threading.Lock()
+
+        if backend == 'sqlite':
+            import sqlite3
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            clustered = ' WITHOUT ROWID'
+        elif backend == 'duckdb':
+            try:
+                import duckdb
+            except ImportError:
+                raise RuntimeError('LOCAL_STORE_BACKEND=duckdb needs: pip install duckdb')
+            self._conn = duckdb.connect(path)
+            clustered = ''
+        else:
+            raise ValueError(f"Unknown LOCAL_STORE_BACKEND: {backend} (sqlite or duckdb)")
+
+        self.stats = {'rows_inserted': 0, 'rows_ignored': 0, 'batches': 0, 'last_batch_ms': 0}
+
+        event_cols = ', '.join(f"{c} TEXT" for c in EVENT_COLUMNS)
+        report_cols = ', '.join(f"{name} {SQL_TYPES[t]}" for name, t in REPORT_SCHEMA)
+        self._execute_script([
+            f"CREATE TABLE IF NOT EXISTS raw_events ({event_cols}, "
+            f"PRIMARY KEY (event_date, event_id)){clustered}",
+            f"CREATE TABLE IF NOT EXISTS daily_reports ({report_cols})",
+            "CREATE INDEX IF NOT EXISTS daily_reports_date ON daily_reports (report_date)",
+        ])
+
+        placeholders = ', '.join('?' for _ in EVENT_COLUMNS)
+        self._insert_sql = (
+            f"INSERT OR IGNORE INTO raw_events ({', '.join(EVENT_COLUMNS)}) VALUES ({placeholders})"
+        )
+
+    # --------------------------------------------------------------------------
+    # Ingestion
+    # --------------------------------------------------------------------------
+
+    def insert_rows_json(self, table, rows):
+        """
+        Insert rows in one transaction (bigquery.Client-compatible)
+
+        RETURNS:
+        - [] : rows either landed or were already there (same event_id)
+        """
+        values = [tuple(row.get(c) for c in EVENT_COLUMNS) for row in rows]
+        start = time.perf_counter()
+        with self._lock:
+            before = self._changes()
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany(self._insert_sql, values)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            inserted = self._changes() - before if self.backend == 'sqlite' else len(values)
+
+            self.stats['rows_inserted'] += inserted
+            self.stats['rows_ignored'] += len(values) - inserted
+            self.stats['batches'] += 1
+            self.stats['last_batch_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return []
+
+    def _changes(self):
+        # SQLite only (cheap counter); DuckDB does not report ignored rows
+        return self._conn.total_changes if self.backend == 'sqlite' else 0
+
+    # --------------------------------------------------------------------------
+    # Reporting
+    # --------------------------------------------------------------------------
+
+    def read_events(self, target_date):
+        """One day's raw events (the 'partition') as row dicts"""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT {', '.join(EVENT_COLUMNS)} FROM raw_events WHERE event_date = ?",
+                [target_date],
+            )
+            return [dict(zip(EVENT_COLUMNS, r)) for r in cursor.fetchall()]
+
+    def build_report(self, target_date, write=True):
+        """
+        daily_reports rows for one date, built with daily_report_builder
+
+        write=True: replace the date's rows in daily_reports (one transaction)
+        """
+        rows = build_daily_report(self.read_events(target_date), target_date)
+        if not write:
+            return rows
+
+        placeholders = ', '.join('?' for _ in REPORT_COLUMNS)
+        values = [tuple(r[c] for c in REPORT_COLUMNS) for r in rows]
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.execute('DELETE FROM daily_reports WHERE report_date = ?', [target_date])
+                if values:
+                    self._conn.executemany(
+                        f"INSERT INTO daily_reports ({', '.join(REPORT_COLUMNS)}) VALUES ({placeholders})",
+                        values,
+                    )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return rows
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['backend'] = self.backend
+        stats['path'] = self.path
+        return stats
+
+    def date_counts(self):
+        """{event_date: rows} for every date in the store"""
+        with self._lock:
+            cursor = self._conn.execute(
+                'SELECT event_date, COUNT(*) FROM raw_events GROUP BY event_date ORDER BY event_date'
+            )
+            return dict(cursor.fetchall())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _execute_script(self, statements):
+        with self._lock:
+            for sql in statements:
+                self._conn.execute(sql)
+
+# ==============================================================================
+# MAIN
+# ==============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Local raw_events store (SQLite / DuckDB)')
+    parser.add_argument('--db', default=LOCAL_STORE_PATH, help='Database file')
+    parser.add_argument('--backend', default=LOCAL_STORE_BACKEND, choices=['sqlite', 'duckdb'])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    report = commands.add_parser('report', help='Build daily_reports for a date')
+    report.add_argument('date', help='Report date (YYYY-MM-DD)')
+    report.add_argument('--output', help='Also write the rows to this JSONL file')
+
+    ingest = commands.add_parser('ingest', help='Load raw event files (raw/<date>/ layout)')
+    ingest.add_argument('directory', help='Local folder laid out like raw/<date>/')
+
+    commands.add_parser('stats', help='Rows per event_date')
+    args = parser.parse_args()
+
+    store = LocalEventStore(args.db, args.backend)
+
+    if args.command == 'ingest':
+        from raw_event_reader import iter_local_events
+
+        start = time.time()
+        events = list(iter_local_events(args.directory))
+        for i in range(0, len(events), 5000):
+            store.insert_rows_json('raw_events', events[i:i + 5000])
+        print(f"Read {len(events)} events, inserted {store.stats['rows_inserted']} "
+              f"({store.stats['rows_ignored']} already there) in {time.time() - start:.1f}s")
+
+    elif args.command == 'report':
+        start = time.time()
+        rows = store.build_report(args.date)
+        print(f"Built {len(rows)} report rows for {args.date} ({time.time() - start:.2f}s)")
+        if args.output:
+            with open(args.output, 'w') as f:
+                for row in rows:
+                    f.write(json.dumps(row) + '\n')
+            print(f"Written to {args.output}")
+
+    else:
+        for date_str, count in store.date_counts().items():
+            print(f"  {date_str}: {count} events")
+
+    store.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+ONLINE SESSIONIZER (ROOM VISITS IN NEAR REAL TIME)
+==================================================
+
+WHAT THIS DOES:
+1. Keeps a small in-memory map of OPEN room visits:
+     (meeting_uuid, participant, breakout_room_uuid) -> JOIN info
+2. JOIN  -> opens a visit (O(1) dict insert)
+3. LEAVE -> closes the matching visit and emits the finished record
+   right away (to the room_visits table)
+4. A sweeper thread drops visits left open longer than stale_after seconds
+   (missed LEAVE) and emits them with closed_by = 'timeout'
+
+WHY:
+- Room visits otherwise only exist after the nightly scheduled query
+- Same-day dashboards had to re-run the whole JOIN/LEAVE match on raw_events
+- Here each event costs one dict update
+
+LIMITS:
+- State is per container: a JOIN and its LEAVE must reach the same instance
+  (single instance or session affinity); unmatched LEAVEs are counted
+- State is lost on restart; daily_reports stays the source of truth
+"""
+
+from datetime import datetime, timezone
+from daily_report_builder import diff_mins, to_micros
+from service_log import log
+import threading
+import time
+
+
+class OnlineSessionizer:
+    """
+    Matches JOIN/LEAVE events as they arrive
+
+    EMIT:
+    - emit(visit_row) is called outside the lock for every closed visit
+    """
+
+    def __init__(self, emit, stale_after=4 * 3600, sweep_interval=60):
+        self.emit = emit
+        self.stale_after = stale_after
+        self.sweep_interval = sweep_interval
+
+        self._lock = threading.Lock()
+        self._open = {}         # key -> (join_row, opened_at monotonic)
+        self._stop = threading.Event()
+
+        self.stats = {
+            'visits_opened': 0,
+            'visits_closed': 0,
+            'visits_timed_out': 0,
+            'duplicate_joins': 0,
+            'unmatched_leaves': 0,
+        }
+
+        self._thread = threading.Thread(
+            target=self._run, name='online-sessionizer', daemon=True
+        )
+        self._thread.start()
+
+    @staticmethod
+    def visit_key(row):
+        # participant_id can be empty (guests): fall back to the display name
+        participant = row.get('participant_id') or row.get('participant_name')
+        return (row.get('meeting_uuid'), participant, row.get('breakout_room_uuid'))
+
+    def observe(self, row):
+        """Feed one parsed event (row from parse_zoom_event)"""
+        if not row.get('breakout_room_uuid'):
+            return
+
+        key = self.visit_key(row)
+        closed = None
+
+        with self._lock:
+            if row.get('action') == 'JOIN':
+                if key in self._open:
+                    # Keep the earliest JOIN (Zoom retry or missed LEAVE)
+                    self.stats['duplicate_joins'] += 1
+                else:
+                    self._open[key] = (row, time.monotonic())
+                    self.stats['visits_opened'] += 1
+            else:
+                entry = self._open.pop(key, None)
+                if entry is None:
+                    self.stats['unmatched_leaves'] += 1
+                else:
+                    self.stats['visits_closed'] += 1
+                    closed = entry[0]
+
+        if closed is not None:
+            self._emit(self.build_visit(closed, row, 'leave'))
+
+    def sweep(self):
+        """Close visits that have been open longer than stale_after"""
+        cutoff = time.monotonic() - self.stale_after
+        with self._lock:
+            stale = [k for k, (_, opened) in self._open.items() if opened < cutoff]
+            rows = [self._open.pop(k)[0] for k in stale]
+            self.stats['visits_timed_out'] += len(rows)
+
+        for join_row in rows:
+            self._emit(self.build_visit(join_row, None, 'timeout'))
+        return len(rows)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['open_visits'] = len(self._open)
+        return stats
+
+    @staticmethod
+    def build_visit(join_row, leave_row, closed_by):
+        """room_visits row (same duration rule as daily_reports)"""
+        join_time = join_row.get('event_timestamp')
+        leave_time = leave_row.get('event_timestamp') if leave_row else None
+
+        duration = None
+        if leave_time:
+            duration = diff_mins(to_micros(leave_time), to_micros(join_time))
+
+        return {
+            'visit_date': join_row.get('event_date'),
+            'meeting_uuid': join_row.get('meeting_uuid'),
+            'participant_id': join_row.get('participant_id'),
+            'participant_name': join_row.get('participant_name'),
+            'participant_email': join_row.get('participant_email'),
+            'room_uuid': join_row.get('breakout_room_uuid'),
+            'room_join_time': join_time,
+            'room_leave_time': leave_time,
+            'room_duration_mins': duration,
+            'closed_by': closed_by,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+        }
+
+    def _emit(self, visit):
+        try:
+            self.emit(visit)
+        except Exception as e:
+            log(f"  -> room_visits Error: {e}", severity='ERROR', key='room_visits_error',
+                error=str(e))
+
+    def _run(self):
+        while not self._stop.wait(self.sweep_interval):
+            swept = self.sweep()
+            if swept:
+                log(f"  -> room_visits: {swept} stale visits timed out", key='room_visits_swept',
+                    swept=swept)
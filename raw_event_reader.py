@@ -0,0 +1,166 @@
+"""
+READ RAW WEBHOOK EVENTS (GCS OR LOCAL DIRECTORY)
+================================================
+
+WHAT THIS DOES:
+- Reads the raw event rows the webhook wrote, in every layout it uses:
+  - raw/<date>/<event_id>.json        : one JSON object per file
+  - raw/<date>/segments/*.jsonl[.gz]  : JSON Lines segments
+  - raw/<date>/events.jsonl[.gz]      : daily file (composed segments)
+  - raw/<date>/archive/*.jsonl.gz     : compacted day (compact_raw_events.py),
+    described by raw/<date>/archive/index.json
+- Works on a GCS bucket or a local copy (e.g. after `gsutil -m cp -r`)
+
+WHY:
+- Local tools (report builder, replays) need the same rows BigQuery gets,
+  without a load job first
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import gzip
+import json
+import os
+
+DAILY_FILES = ('events.jsonl', 'events.jsonl.gz')
+
+ARCHIVE_DIR = 'archive'
+ARCHIVE_INDEX = f'{ARCHIVE_DIR}/index.json'
+
+
+def classify_raw_object(rest):
+    """
+    Which layout a path (relative to raw/<date>/) belongs to
+
+    RETURNS:
+    - 'json', 'segment', 'daily', 'archive', or None (not an event file)
+    """
+    if rest.startswith(ARCHIVE_DIR + '/') and rest.endswith('.jsonl.gz'):
+        return 'archive'
+    if rest.startswith('segments/') and (rest.endswith('.jsonl') or rest.endswith('.jsonl.gz')):
+        return 'segment'
+    if rest in DAILY_FILES:
+        return 'daily'
+    if rest.endswith('.json') and '/' not in rest:
+        return 'json'
+    return None
+
+
+def select_raw_objects(paths, index=None):
+    """
+    Pick the files to read for one date (paths relative to raw/<date>/)
+
+    RULES:
+    - The daily file is a copy of the segments, so it is only used once the
+      segments have been deleted (otherwise every event would be read twice)
+    - Compacted day (index = archive/index.json contents): files listed in
+      index['sources'] are already inside the archive and are skipped, even
+      if they were not deleted; archive parts count only once they are in
+      index['parts'] (a part from an interrupted run is ignored)
+    """
+    index = index or {}
+    compacted = set(index.get('sources', ()))
+    parts = index.get('parts', {})
+
+    kinds = {p: classify_raw_object(p) for p in paths if p not in compacted}
+    has_segments = 'segment' in kinds.values()
+    return sorted(
+        p for p, kind in kinds.items()
+        if kind in ('json', 'segment')
+        or (kind == 'daily' and not has_segments)
+        or (kind == 'archive' and p in parts)
+    )
+
+
+def read_archive_index(bucket, prefix, date_str):
+    """archive/index.json for a date in GCS ({} if the day is not compacted)"""
+    from google.api_core.exceptions import NotFound
+
+    try:
+        return json.loads(bucket.blob(f"{prefix}/{date_str}/{ARCHIVE_INDEX}").download_as_text())
+    except NotFound:
+        return {}
+
+
+def parse_raw_object(name, data):
+    """Turn one file's bytes into a list of event rows"""
+    if name.endswith('.gz'):
+        data = gzip.decompress(data)
+    text = data.decode('utf-8')
+
+    if name.endswith('.json'):
+        # Individual event file (may be pretty-printed over several lines)
+        return [json.loads(text)]
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def iter_local_events(directory):
+    """
+    Yield event rows from a local folder laid out like raw/<date>/
+
+    EXAMPLE:
+        iter_local_events('./raw/2026-02-03')
+    """
+    paths = []
+    for root, _, files in os.walk(directory):
+        for f in files:
+            paths.append(os.path.relpath(os.path.join(root, f), directory).replace(os.sep, '/'))
+
+    index = {}
+    if ARCHIVE_INDEX in paths:
+        with open(os.path.join(directory, ARCHIVE_INDEX)) as fh:
+            index = json.load(fh)
+
+    for rel in select_raw_objects(paths, index):
+        with open(os.path.join(directory, rel), 'rb') as fh:
+            yield from parse_raw_object(rel, fh.read())
+
+
+def iter_gcs_events(bucket, prefix, date_str, workers=16):
+    """
+    Yield event rows for one date from GCS
+
+    HOW:
+    - Lists raw/<date>/ once, picks the files for the layouts found
+      (archive parts instead of the files they replaced)
+    - Downloads in parallel (many small objects = latency bound, not bandwidth)
+    """
+    base = f"{prefix}/{date_str}/"
+    blobs = {b.name[len(base):]: b for b in bucket.list_blobs(prefix=base)}
+    index = read_archive_index(bucket, prefix, date_str) if ARCHIVE_INDEX in blobs else {}
+    selected = [blobs[rel] for rel in select_raw_objects(blobs, index)]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for blob, data in zip(selected, pool.map(lambda b: b.download_as_bytes(), selected)):
+            yield from parse_raw_object(blob.name, data)
+
+
+def next_date(date_str):
+    return str(date.fromisoformat(date_str) + timedelta(days=1))
+
+
+def iter_gcs_day_events(bucket, prefix, event_date, workers=16):
+    """
+    Yield every row that can have this event_date: raw/<date>/ and raw/<date+1>/
+
+    WHY THE NEXT FOLDER:
+    - raw/<date>/ is the UTC date the webhook received the event; an event
+      from just before midnight delivered after it (Zoom retry, spool
+      replay) lands in the next day's folder
+    - Callers keep filtering on event_date, as the SQL does
+    """
+    yield from iter_gcs_events(bucket, prefix, event_date, workers)
+    yield from iter_gcs_events(bucket, prefix, next_date(event_date), workers)
+
+
+def iter_local_day_events(directory, event_date):
+    """
+    Local version of iter_gcs_day_events: directory is a copy of raw/<date>/;
+    the next day's folder next to it (raw/<date+1>/) is read too when present
+    """
+    yield from iter_local_events(directory)
+    directory = directory.rstrip('/\\')
+    if os.path.basename(directory) == event_date:
+        following = os.path.join(os.path.dirname(directory), next_date(event_date))
+        if os.path.isdir(following):
+            yield from iter_local_events(following)
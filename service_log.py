@@ -0,0 +1,75 @@
+"""
+STRUCTURED, RATE-LIMITED LOGGING FOR THE WEBHOOK
+================================================
+
+WHAT THIS DOES:
+- log(message, key=..., **fields) replaces the webhook's print() calls
+- LOG_FORMAT=text (default): prints the message exactly like before
+- LOG_FORMAT=json: one JSON object per line with severity, message and the
+  fields -> Cloud Logging parses it into jsonPayload (filterable)
+- LOG_RATE_LIMIT: max lines per second per key; extra lines are dropped and
+  counted, and the next line that gets through reports how many were dropped
+
+WHY:
+- One print per sink per event floods the logs during room reassignments
+  (hundreds of events in seconds) and costs CPU on the request path
+- An outage (e.g. BigQuery errors) printed the same error for every event
+"""
+
+from fast_json import dumps
+import os
+import sys
+import threading
+import time
+
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+LOG_RATE_LIMIT = float(os.environ.get('LOG_RATE_LIMIT', 0))  # per key per second, 0 = no limit
+
+_lock = threading.Lock()
+_windows = {}       # key -> [window start second, lines in window, suppressed]
+
+
+def _allow(key):
+    """
+    RETURNS:
+    - (allowed, suppressed lines to report)
+    """
+    now = int(time.monotonic())
+    with _lock:
+        window = _windows.get(key)
+        if window is None or window[0] != now:
+            suppressed = window[2] if window else 0
+            _windows[key] = [now, 1, 0]
+            return True, suppressed
+        if window[1] < LOG_RATE_LIMIT:
+            window[1] += 1
+            return True, 0
+        window[2] += 1
+        return False, 0
+
+
+def log(message, severity='INFO', key=None, **fields):
+    """
+    Write one log line
+
+    key: rate-limit bucket (default: severity + first two words of the message);
+    use one key per kind of line, e.g. 'bigquery_error'
+    """
+    suppressed = 0
+    if LOG_RATE_LIMIT > 0:
+        allowed, suppressed = _allow(key or f"{severity}:{' '.join(message.split()[:2])}")
+        if not allowed:
+            return
+
+    if LOG_FORMAT == 'json':
+        # One line, without the text mode's '->' arrows
+        entry = {'severity': severity, 'message': ' '.join(message.replace('->', ' ').split())}
+        entry.update(fields)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        line = dumps(entry).decode('utf-8')
+    else:
+        line = message if not suppressed else f"{message} ({suppressed} similar lines suppressed)"
+
+    # One write per line: lines from worker threads do not interleave
+    sys.stdout.write(line + '\n')
@@ -0,0 +1,160 @@
+"""
+BOUNDED BACKGROUND SINK PIPELINE
+================================
+
+WHAT THIS DOES:
+1. Webhook handler parses the event and puts it on a bounded in-process queue
+2. Handler acknowledges Zoom right away (no cloud round trips in the request)
+3. A pool of worker threads drains the queue to the sinks (GCS, BigQuery)
+4. When the queue is full, submit() returns False -> handler answers 503
+   with Retry-After, so Zoom retries later instead of memory growing forever
+
+WHY:
+- Zoom's delivery latency no longer includes GCS + BigQuery round trips
+- Slow sinks no longer make Zoom time out and retry
+- Queue depth, drain rate and rejects are visible via get_stats()
+
+NOTE:
+- Events waiting in the queue live in memory only; they are drained on a
+  graceful shutdown (close) but lost if the container is killed hard
+"""
+
+from collections import deque
+from concurrent.futures import Future
+from service_log import log
+import queue
+import threading
+import time
+
+# Drain rate is averaged over this many seconds
+RATE_WINDOW_SECS = 60
+
+
+class SinkPipeline:
+    """
+    Bounded queue + worker pool that writes each event to every sink
+
+    SINKS:
+    - List of (name, function) pairs, e.g. [('gcs', write_to_gcs_individual)]
+    - Each function gets the row dict; a falsy return or exception = failure
+    - Batched sinks return a Future (list of errors, [] = OK): it is counted
+      when it completes, the worker does not wait for the batch
+    """
+
+    def __init__(self, sinks, max_queue=1000, workers=4):
+        self.sinks = list(sinks)
+        self.max_queue = max_queue
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._completed = deque()   # [[second, count], ...] for drain rate
+        self._closed = False
+
+        self.stats = {
+            'accepted': 0,
+            'rejected': 0,          # Queue full -> 503 to Zoom
+            'processed': 0,
+            'sink_failures': {name: 0 for name, _ in self.sinks},
+        }
+
+        self._workers = []
+        for i in range(workers):
+            t = threading.Thread(target=self._run, name=f'sink-worker-{i}', daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    def submit(self, row):
+        """
+        Queue one event for the workers
+
+        RETURNS:
+        - True: accepted
+        - False: queue full (or shutting down), caller should push back
+        """
+        if self._closed:
+            return False
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self.stats['rejected'] += 1
+            return False
+
+        with self._lock:
+            self.stats['accepted'] += 1
+        return True
+
+    def close(self, timeout=30):
+        """Stop accepting events, drain the queue, stop the workers"""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._workers:
+            self.queue.put(None)  # Sentinel: one per worker
+        deadline = time.monotonic() + timeout
+        for t in self._workers:
+            t.join(timeout=max(deadline - time.monotonic(), 0))
+
+    def get_stats(self):
+        """Snapshot for the health endpoint"""
+        with self._lock:
+            self._trim_rate_window(int(time.time()))
+            done = sum(count for _, count in self._completed)
+            stats = dict(self.stats)
+            stats['sink_failures'] = dict(self.stats['sink_failures'])
+
+        stats['queue_depth'] = self.queue.qsize()
+        stats['max_queue'] = self.max_queue
+        stats['workers'] = len(self._workers)
+        stats['drain_rate_per_sec'] = round(done / RATE_WINDOW_SECS, 2)
+        return stats
+
+    # --------------------------------------------------------------------------
+    # Workers
+    # --------------------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            row = self.queue.get()
+            if row is None:
+                return
+
+            for name, write in self.sinks:
+                try:
+                    ok = write(row)
+                except Exception as e:
+                    log(f"  -> {name} Error: {e}", severity='ERROR',
+                        key=f'{name}_error', sink=name, error=str(e))
+                    ok = False
+                if isinstance(ok, Future):
+                    ok.add_done_callback(lambda f, name=name: self._check_future(f, name))
+                elif not ok:
+                    self._record_failure(name)
+
+            self._record_completed()
+
+    def _check_future(self, future, name):
+        """Done-callback of a batched sink's Future"""
+        try:
+            errors = future.result()
+        except Exception:
+            errors = True   # Whole call failed: the writer logged it once per batch
+        if errors:
+            self._record_failure(name)
+
+    def _record_failure(self, name):
+        with self._lock:
+            self.stats['sink_failures'][name] += 1
+
+    def _record_completed(self):
+        now = int(time.time())
+        with self._lock:
+            self.stats['processed'] += 1
+            if self._completed and self._completed[-1][0] == now:
+                self._completed[-1][1] += 1
+            else:
+                self._completed.append([now, 1])
+            self._trim_rate_window(now)
+
+    def _trim_rate_window(self, now):
+        while self._completed and self._completed[0][0] <= now - RATE_WINDOW_SECS:
+            self._completed.popleft()
@@ -19,14 +19,22 @@ FIELDS UPDATED:
 
 HOW TO RUN:
   python update_camera_data.py 2026-02-03
+  python update_camera_data.py --from 2026-02-01 --to 2026-02-28   (backfill)
 """
 
 import requests
 import urllib.parse
-from datetime import datetime, date
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta
 from google.cloud import bigquery
-import sys
+from qos_camera import classify_qos_page
+from requests.adapters import HTTPAdapter
+from zoom_api_cache import ZoomApiCache
+import argparse
+import json
 import os
+import threading
+import time
 
 # ==============================================================================
 # CONFIGURATION
@@ -42,6 +50,70 @@ MEETING_ID = os.environ.get('ZOOM_MEETING_ID', '9034027764')
 GCP_PROJECT_ID = os.environ.get('GCP_PROJECT_ID', 'your-project-id')
 BQ_DATASET = os.environ.get('BQ_DATASET', 'zoom_tracker')
 
+# Zoom HTTP settings
+QOS_PAGE_SIZE = int(os.environ.get('QOS_PAGE_SIZE', 100))
+ZOOM_HTTP_POOL_SIZE = int(os.environ.get('ZOOM_HTTP_POOL_SIZE', 8))
+ZOOM_API_CONCURRENCY = int(os.environ.get('ZOOM_API_CONCURRENCY', 4))
+
+# Camera classification (see qos_camera.py)
+QOS_CAMERA_THRESHOLD_KBPS = float(os.environ.get('QOS_CAMERA_THRESHOLD_KBPS', 50))
+QOS_SAMPLE_SECS = float(os.environ.get('QOS_SAMPLE_SECS', 60))
+QOS_MAX_GAP_SECS = float(os.environ.get('QOS_MAX_GAP_SECS', 120))
+
+# On-disk cache for token + meeting instances ('' = disabled)
+ZOOM_CACHE_PATH = os.environ.get('ZOOM_CACHE_PATH', '~/.cache/zoom_tracker/zoom_api_cache.json')
+
+# Optional audit file: one JSON line per reduced participant (no raw samples)
+QOS_SPILL_PATH = os.environ.get('QOS_SPILL_PATH', '')
+
+# Range mode (--from/--to): meeting instances fetched at the same time
+BACKFILL_CONCURRENCY = int(os.environ.get('BACKFILL_CONCURRENCY', 4))
+
+# Shared HTTP session (keep-alive + connection pool, created lazily)
+http_session = None
+http_session_lock = threading.Lock()
+
+# Max Zoom requests in flight at once (across all threads)
+zoom_api_slots = threading.BoundedSemaphore(ZOOM_API_CONCURRENCY)
+
+# Metadata cache (created lazily)
+zoom_cache = None
+
+# Spill file writes from concurrent fetches (range mode)
+spill_lock = threading.Lock()
+
+# ==============================================================================
+# HTTP SESSION
+# ==============================================================================
+
+def get_http_session():
+    """
+    Get or create the shared requests session
+
+    WHY:
+    - Bare requests.get() opens a new TLS connection for every page
+    - A session keeps connections alive and reuses them from a pool
+    """
+    global http_session
+    with http_session_lock:
+        if http_session is None:
+            http_session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=ZOOM_HTTP_POOL_SIZE)
+            http_session.mount('https://', adapter)
+        return http_session
+
+def zoom_get(url, **kwargs):
+    """GET through the shared session, limited to ZOOM_API_CONCURRENCY at once"""
+    with zoom_api_slots:
+        return get_http_session().get(url, **kwargs)
+
+def get_zoom_cache():
+    """Get or create the on-disk metadata cache (None if disabled)"""
+    global zoom_cache
+    if zoom_cache is None and ZOOM_CACHE_PATH:
+        zoom_cache = ZoomApiCache(ZOOM_CACHE_PATH)
+    return zoom_cache
+
 # ==============================================================================
 # ZOOM API FUNCTIONS
 # ==============================================================================
@@ -54,17 +126,29 @@ def get_zoom_token():
     - Uses Server-to-Server OAuth (no user login needed)
     - Token valid for 1 hour
     - Credentials set in Zoom Marketplace app
+    - Cached on disk until 5 minutes before it expires
     """
     print("  Getting Zoom API token...", end=" ")
 
+    cache = get_zoom_cache()
+    cache_key = f"token:{ACCOUNT_ID}:{CLIENT_ID}"
+    if cache:
+        token = cache.get(cache_key)
+        if token:
+            print("OK (cached)")
+            return token
+
     url = 'https://zoom.us/oauth/token'
     params = {'grant_type': 'account_credentials', 'account_id': ACCOUNT_ID}
 
     try:
-        response = requests.post(url, params=params, auth=(CLIENT_ID, CLIENT_SECRET), timeout=30)
+        response = get_http_session().post(url, params=params, auth=(CLIENT_ID, CLIENT_SECRET), timeout=30)
 
         if response.status_code == 200:
-            token = response.json().get('access_token')
+            body = response.json()
+            token = body.get('access_token')
+            if cache and token:
+                cache.set(cache_key, token, ttl=max(int(body.get('expires_in', 3600)) - 300, 60))
             print("OK")
             return token
         else:
@@ -74,6 +158,75 @@ def get_zoom_token():
         print(f"ERROR: {e}")
         return None
 
+def get_meeting_instances(token):
+    """
+    Download the date -> meeting UUID index for all past instances
+
+    RETURNS:
+    - {'YYYY-MM-DD': uuid} (first instance listed for each date), or None
+    """
+    headers = {'Authorization': f'Bearer {token}'}
+    url = f'https://api.zoom.us/v2/past_meetings/{MEETING_ID}/instances'
+
+    response = zoom_get(url, headers=headers, timeout=30)
+
+    if response.status_code != 200:
+        print(f"FAILED ({response.status_code})")
+        return None
+
+    index = {}
+    for m in response.json().get('meetings', []):
+        start = m.get('start_time', '')
+        if start and m.get('uuid'):
+            meeting_date = datetime.fromisoformat(start.replace('Z', '+00:00')).date()
+            index.setdefault(str(meeting_date), m.get('uuid'))
+    return index
+
+def get_instance_index(token, target_dates):
+    """
+    date -> meeting UUID for the given dates, from cache when possible
+
+    CACHE RULES:
+    - Past instances never change: cached dates never expire
+    - Dates at least two days before the last download with no instance are
+      known to have no meeting (no need to ask again); yesterday and today
+      are asked again, Zoom may not list a running or just-ended instance yet
+    - Any other date: download the list once and merge it into the cache
+
+    RETURNS:
+    - {'YYYY-MM-DD': uuid or None} for every target date, or None on error
+    """
+    wanted = [str(d) for d in target_dates]
+    cache = get_zoom_cache()
+    cache_key = f"instances:{MEETING_ID}"
+    cached = (cache.peek(cache_key) if cache else None) or {'dates': {}, 'complete_before': ''}
+
+    def resolved(d):
+        return d in cached['dates'] or d < cached['complete_before']
+
+    if all(resolved(d) for d in wanted):
+        if cache:
+            for _ in wanted:
+                cache.count(True)
+        return {d: cached['dates'].get(d) for d in wanted}
+
+    if cache:
+        for d in wanted:
+            cache.count(resolved(d))
+
+    index = get_meeting_instances(token)
+    if index is None:
+        return None
+
+    merged = dict(cached['dates'])
+    merged.update(index)
+    # Yesterday, not today: a missing instance for a recent day is not cached as "no meeting"
+    cached = {'dates': merged, 'complete_before': str(datetime.utcnow().date() - timedelta(days=1))}
+    if cache:
+        cache.set(cache_key, cached)
+
+    return {d: merged.get(d) for d in wanted}
+
 def get_meeting_uuid(token, target_date):
     """
     Find meeting UUID for a specific date
@@ -85,26 +238,15 @@ def get_meeting_uuid(token, target_date):
     """
     print("  Finding meeting UUID...", end=" ")
 
-    headers = {'Authorization': f'Bearer {token}'}
-    url = f'https://api.zoom.us/v2/past_meetings/{MEETING_ID}/instances'
-
     try:
-        response = requests.get(url, headers=headers, timeout=30)
-
-        if response.status_code != 200:
-            print(f"FAILED ({response.status_code})")
+        index = get_instance_index(token, [target_date])
+        if index is None:
             return None
 
-        meetings = response.json().get('meetings', [])
-
-        for m in meetings:
-            start = m.get('start_time', '')
-            if start:
-                meeting_date = datetime.fromisoformat(start.replace('Z', '+00:00')).date()
-                if meeting_date == target_date:
-                    uuid = m.get('uuid')
-                    print(f"Found: {uuid[:20]}...")
-                    return uuid
+        uuid = index[str(target_date)]
+        if uuid:
+            print(f"Found: {uuid[:20]}...")
+            return uuid
 
         print("Not found for this date")
         return None
@@ -113,7 +255,110 @@ def get_meeting_uuid(token, target_date):
         print(f"ERROR: {e}")
         return None
 
-def fetch_qos_data(token, meeting_uuid):
+def iter_qos_pages(token, meeting_uuid, page_size=None, timings=None):
+    """
+    Yield QOS participants one page at a time, prefetching the next page
+
+    HOW:
+    - Zoom pages with next_page_token, so page N+1 can't be requested
+      before page N arrives
+    - As soon as page N arrives we read its token and send the request for
+      page N+1, THEN hand page N to the caller
+    - The caller's work on page N overlaps the network wait for page N+1
+
+    TIMINGS:
+    - If a list is passed, one dict per page is appended:
+      {'page', 'participants', 'fetch_ms', 'wait_ms'}
+      fetch_ms = request time, wait_ms = time we actually blocked on it
+    """
+    headers = {'Authorization': f'Bearer {token}'}
+    encoded_uuid = urllib.parse.quote(meeting_uuid, safe='')
+    url = f'https://api.zoom.us/v2/metrics/meetings/{encoded_uuid}/participants/qos'
+    page_size = page_size or QOS_PAGE_SIZE
+
+    def fetch_page(next_token):
+        params = {'type': 'past', 'page_size': page_size}
+        if next_token:
+            params['next_page_token'] = next_token
+        start = time.monotonic()
+        response = zoom_get(url, headers=headers, params=params, timeout=60)
+        if response.status_code != 200:
+            return None, 0
+        return response.json(), (time.monotonic() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=1) as prefetch:
+        future = prefetch.submit(fetch_page, None)
+        page = 0
+
+        while future is not None:
+            wait_start = time.monotonic()
+            try:
+                data, fetch_ms = future.result()
+            except Exception as e:
+                print(f"ERROR: {e}")
+                return
+            wait_ms = (time.monotonic() - wait_start) * 1000
+
+            if data is None:
+                return
+
+            next_token = data.get('next_page_token')
+            future = prefetch.submit(fetch_page, next_token) if next_token else None
+
+            participants = data.get('participants', [])
+            page += 1
+            if timings is not None:
+                timings.append({
+                    'page': page,
+                    'participants': len(participants),
+                    'fetch_ms': round(fetch_ms, 1),
+                    'wait_ms': round(wait_ms, 1),
+                })
+            yield participants
+
+def print_page_timings(timings, wall_ms):
+    """Where did the wall-clock time go? (network vs. our processing)"""
+    if not timings:
+        return
+    fetch = [t['fetch_ms'] for t in timings]
+    wait = sum(t['wait_ms'] for t in timings)
+    print(f"    {len(timings)} pages in {wall_ms:.0f} ms | "
+          f"fetch avg {sum(fetch) / len(fetch):.0f} ms, max {max(fetch):.0f} ms | "
+          f"blocked on network {wait:.0f} ms, processing {max(wall_ms - wait, 0):.0f} ms")
+
+def iter_qos_stats(token, meeting_uuid, timings=None, spill_file=None):
+    """
+    Stream reduced QOS stats, one participant at a time
+
+    WHY A GENERATOR:
+    - Each page is reduced as soon as it arrives, then its raw per-minute
+      samples are dropped
+    - Peak memory = one page of samples, not the whole meeting
+
+    HOW EACH PAGE IS REDUCED:
+    - classify_qos_page (NumPy): time-weighted camera ON/OFF seconds,
+      keyed by Zoom user ID
+
+    YIELDS:
+    - {'user_id', 'user_name', 'camera_on_secs', 'camera_off_secs', 'samples'}
+    """
+    for participants in iter_qos_pages(token, meeting_uuid, timings=timings):
+        page_stats = classify_qos_page(
+            participants,
+            threshold_kbps=QOS_CAMERA_THRESHOLD_KBPS,
+            sample_secs=QOS_SAMPLE_SECS,
+            max_gap_secs=QOS_MAX_GAP_SECS
+        )
+        participants.clear()  # Release this page's samples before the next one
+
+        for key, reduced in page_stats.items():
+            reduced['key'] = key
+            if spill_file is not None:
+                with spill_lock:
+                    spill_file.write(json.dumps(reduced) + '\n')
+            yield reduced
+
+def fetch_qos_data(token, meeting_uuid, spill_path=None):
     """
     Fetch QOS (Quality of Service) data from Zoom API
 
@@ -123,9 +368,20 @@ def fetch_qos_data(token, meeting_uuid):
     - Resolution, frame rate
 
     HOW WE DETECT CAMERA ON:
-    - video_input.bitrate > 50 kbps = camera is ON
-    - video_input.bitrate <= 50 kbps = camera is OFF
-    - Each sample = ~1 minute of data
+    - video_input.bitrate > QOS_CAMERA_THRESHOLD_KBPS (50) = camera is ON
+    - Each sample counts for the real time until the participant's next
+      sample (capped by QOS_MAX_GAP_SECS), not a flat "1 minute"
+
+    HOW WE FETCH:
+    - Shared keep-alive session, next page requested while this one is read
+    - Page size: QOS_PAGE_SIZE, in-flight requests: ZOOM_API_CONCURRENCY
+    - Streamed: samples are reduced page by page (see iter_qos_stats) into
+      running totals per Zoom user ID; spill_path / QOS_SPILL_PATH keeps an
+      audit JSONL of the reduced records
+
+    RETURNS:
+    - Stats per participant_name (daily_reports is keyed by name); different
+      user IDs with the same name are only combined at this last step
     """
     print("  Fetching QOS data...", end=" ")
 
@@ -133,79 +389,136 @@ def fetch_qos_data(token, meeting_uuid):
         print("No UUID")
         return {}
 
-    headers = {'Authorization': f'Bearer {token}'}
-    encoded_uuid = urllib.parse.quote(meeting_uuid, safe='')
-    url = f'https://api.zoom.us/v2/metrics/meetings/{encoded_uuid}/participants/qos'
+    video_stats, participants, timings, wall_ms = collect_video_stats(token, meeting_uuid, spill_path)
 
-    all_qos = []
-    next_token = None
-    page = 0
+    print(f"{participants} participants")
+    print_page_timings(timings, wall_ms)
 
-    while True:
-        params = {'type': 'past', 'page_size': 100}
-        if next_token:
-            params['next_page_token'] = next_token
-
-        try:
-            response = requests.get(url, headers=headers, params=params, timeout=60)
-
-            if response.status_code != 200:
-                break
-
-            data = response.json()
-            participants = data.get('participants', [])
-            all_qos.extend(participants)
+    return video_stats
 
-            page += 1
-            next_token = data.get('next_page_token')
+def collect_video_stats(token, meeting_uuid, spill_path=None):
+    """
+    Camera stats for one meeting instance (no printing, safe to run in threads)
 
-            if not next_token:
-                break
+    RETURNS:
+    - (video_stats by name, participant count, page timings, wall ms)
+    """
+    spill_path = spill_path or QOS_SPILL_PATH
+    spill_file = open(spill_path, 'a') if spill_path else None
 
-        except Exception as e:
-            print(f"ERROR: {e}")
-            break
+    timings = []
+    start = time.monotonic()
 
-    print(f"{len(all_qos)} participants")
+    # Running totals per user ID: [name, on_secs, off_secs, samples]
+    totals = {}
+    try:
+        for reduced in iter_qos_stats(token, meeting_uuid, timings, spill_file):
+            t = totals.setdefault(reduced['key'], [reduced['user_name'], 0.0, 0.0, 0])
+            t[1] += reduced['camera_on_secs']
+            t[2] += reduced['camera_off_secs']
+            t[3] += reduced['samples']
+    finally:
+        if spill_file is not None:
+            spill_file.close()
+
+    wall_ms = (time.monotonic() - start) * 1000
+
+    by_name = {}
+    for name, on_secs, off_secs, samples in totals.values():
+        n = by_name.setdefault(name, [0.0, 0.0, 0])
+        n[0] += on_secs
+        n[1] += off_secs
+        n[2] += samples
 
-    # Process QOS data
     video_stats = {}
-
-    for p in all_qos:
-        name = p.get('user_name', 'Unknown')
-        qos_list = p.get('user_qos', []) or p.get('qos', [])
-
-        video_on = 0   # Samples with camera ON
-        video_off = 0  # Samples with camera OFF
-
-        for qos in qos_list:
-            bitrate_str = qos.get('video_input', {}).get('bitrate', '0') or '0'
-            try:
-                # Bitrate format: "123 kbps" or just "123"
-                bitrate = int(str(bitrate_str).split()[0]) if bitrate_str else 0
-            except:
-                bitrate = 0
-
-            # > 50 kbps = camera sending video
-            if bitrate > 50:
-                video_on += 1
-            else:
-                video_off += 1
-
-        total = video_on + video_off
+    for name, (on_secs, off_secs, samples) in by_name.items():
+        total = on_secs + off_secs
         video_stats[name] = {
-            'camera_on': video_on,
-            'camera_off': video_off,
-            'camera_pct': round(video_on / total * 100, 1) if total > 0 else 0,
-            'total_samples': total
+            'camera_on': round(on_secs / 60, 1),
+            'camera_off': round(off_secs / 60, 1),
+            'camera_pct': round(on_secs / total * 100, 1) if total > 0 else 0,
+            'total_samples': samples
         }
 
-    return video_stats
+    return video_stats, len(totals), timings, wall_ms
 
 # ==============================================================================
 # BIGQUERY FUNCTIONS
 # ==============================================================================
 
+def merge_camera_stats(stats_by_date):
+    """
+    Apply camera stats for one or more dates with ONE MERGE
+
+    HOW:
+    - All (date, participant) stats go in ONE array query parameter
+    - ONE MERGE matches by report_date and participant_name
+    - Same script returns, per date, the rows updated and names matched
+
+    WHY (vs. one UPDATE per participant):
+    - 300 attendees = 300 sequential DML jobs, each queued and billed
+    - Query parameters: no SQL built from names, no hand-written escaping
+
+    RETURNS:
+    - {date: {'updated': rows, 'matched': [...], 'unmatched': [...]}}
+    """
+    client = bigquery.Client(project=GCP_PROJECT_ID)
+    table = f"{GCP_PROJECT_ID}.{BQ_DATASET}.daily_reports"
+
+    stats_param = bigquery.ArrayQueryParameter('stats', 'STRUCT', [
+        bigquery.StructQueryParameter(
+            None,
+            bigquery.ScalarQueryParameter('report_date', 'DATE', str(report_date)),
+            bigquery.ScalarQueryParameter('participant_name', 'STRING', name),
+            bigquery.ScalarQueryParameter('camera_on', 'FLOAT64', stats['camera_on']),
+            bigquery.ScalarQueryParameter('camera_off', 'FLOAT64', stats['camera_off']),
+            bigquery.ScalarQueryParameter('camera_pct', 'FLOAT64', stats['camera_pct'])
+        )
+        for report_date, video_stats in stats_by_date.items()
+        for name, stats in video_stats.items()
+    ])
+    dates_param = bigquery.ArrayQueryParameter(
+        'dates', 'DATE', [str(d) for d in stats_by_date]
+    )
+
+    query = f"""
+    MERGE `{table}` t
+    USING (SELECT * FROM UNNEST(@stats)) s
+    ON t.report_date IN UNNEST(@dates)
+      AND t.report_date = s.report_date
+      AND t.participant_name = s.participant_name
+    WHEN MATCHED THEN UPDATE SET
+        camera_on_mins = s.camera_on,
+        camera_off_mins = s.camera_off,
+        camera_percentage = s.camera_pct;
+
+    SELECT
+        s.report_date,
+        COUNT(*) AS updated_rows,
+        ARRAY_AGG(DISTINCT s.participant_name) AS matched
+    FROM `{table}` t
+    JOIN UNNEST(@stats) s
+      ON t.report_date = s.report_date
+     AND t.participant_name = s.participant_name
+    WHERE t.report_date IN UNNEST(@dates)
+    GROUP BY s.report_date
+    """
+
+    job_config = bigquery.QueryJobConfig(query_parameters=[stats_param, dates_param])
+    rows = client.query(query, job_config=job_config).result()
+    found = {str(row['report_date']): row for row in rows}
+
+    summary = {}
+    for report_date, video_stats in stats_by_date.items():
+        row = found.get(str(report_date))
+        matched = set(row['matched']) if row else set()
+        summary[str(report_date)] = {
+            'updated': row['updated_rows'] if row else 0,
+            'matched': sorted(matched),
+            'unmatched': sorted(set(video_stats) - matched),
+        }
+    return summary
+
 def update_bigquery_camera_data(target_date, video_stats):
     """
     Update daily_reports table with camera data
@@ -216,42 +529,27 @@ def update_bigquery_camera_data(target_date, video_stats):
     - camera_percentage
 
     HOW:
-    - Matches by report_date and participant_name
-    - Uses UPDATE statement
+    - One MERGE for the date (see merge_camera_stats)
     """
     print("  Updating BigQuery...", end=" ")
 
-    client = bigquery.Client(project=GCP_PROJECT_ID)
-    table = f"{GCP_PROJECT_ID}.{BQ_DATASET}.daily_reports"
+    if not video_stats:
+        print("nothing to update")
+        return 0
+
+    try:
+        result = merge_camera_stats({target_date: video_stats})[str(target_date)]
+    except Exception as e:
+        print(f"ERROR: {e}")
+        return 0
 
-    updated = 0
-    errors = 0
-
-    for name, stats in video_stats.items():
-        # Escape single quotes in names
-        safe_name = name.replace("'", "\\'")
-
-        query = f"""
-        UPDATE `{table}`
-        SET
-            camera_on_mins = {stats['camera_on']},
-            camera_off_mins = {stats['camera_off']},
-            camera_percentage = {stats['camera_pct']}
-        WHERE report_date = '{target_date}'
-          AND participant_name = '{safe_name}'
-        """
-
-        try:
-            job = client.query(query)
-            job.result()  # Wait for completion
-            if job.num_dml_affected_rows > 0:
-                updated += job.num_dml_affected_rows
-        except Exception as e:
-            errors += 1
-            print(f"\n    Error updating {name}: {e}")
-
-    print(f"{updated} rows updated, {errors} errors")
-    return updated
+    unmatched = result['unmatched']
+    print(f"{result['updated']} rows updated, {len(result['matched'])} participants matched, "
+          f"{len(unmatched)} unmatched")
+    if unmatched:
+        print(f"    Unmatched (no report row): {', '.join(unmatched[:10])}"
+              + (" ..." if len(unmatched) > 10 else ""))
+    return result['updated']
 
 def show_report_preview(target_date):
     """Show preview of updated report"""
@@ -284,14 +582,99 @@ def show_report_preview(target_date):
 # MAIN
 # ==============================================================================
 
+def print_cache_stats():
+    cache = get_zoom_cache()
+    if cache:
+        stats = cache.get_stats()
+        print(f"\nZoom API cache: {stats['hits']} hits, {stats['misses']} misses")
+
+def backfill(date_from, date_to):
+    """
+    Camera data for a range of dates in one run
+
+    HOW:
+    1. One token, one instance lookup for ALL dates (cached index)
+    2. QOS for several instances at once (BACKFILL_CONCURRENCY meetings,
+       ZOOM_API_CONCURRENCY requests in flight overall)
+    3. ONE MERGE for all dates at the end
+    4. Per-date summary
+    """
+    dates = []
+    d = date_from
+    while d <= date_to:
+        dates.append(d)
+        d += timedelta(days=1)
+
+    print(f"Dates: {date_from} -> {date_to} ({len(dates)} days)")
+    print()
+
+    print("[1/4] Zoom API Authentication")
+    token = get_zoom_token()
+    if not token:
+        print("FAILED: Could not get Zoom token")
+        return
+
+    print("\n[2/4] Find Meeting Instances")
+    index = get_instance_index(token, dates)
+    if index is None:
+        print("FAILED: Could not list meeting instances")
+        return
+    found = {d: uuid for d, uuid in index.items() if uuid}
+    print(f"  {len(found)} of {len(dates)} dates have a meeting")
+
+    print(f"\n[3/4] Fetch Camera Data (QOS), {BACKFILL_CONCURRENCY} meetings at a time")
+    results = {}
+    start = time.monotonic()
+
+    def fetch(item):
+        day, meeting_uuid = item
+        return day, collect_video_stats(token, meeting_uuid)
+
+    with ThreadPoolExecutor(max_workers=BACKFILL_CONCURRENCY) as pool:
+        for day, (video_stats, participants, timings, wall_ms) in pool.map(fetch, found.items()):
+            results[day] = video_stats
+            print(f"  {day}: {participants} participants, {len(timings)} pages, {wall_ms / 1000:.1f}s")
+    print(f"  Total: {time.monotonic() - start:.1f}s")
+
+    print("\n[4/4] Update BigQuery (one MERGE)")
+    to_update = {d: stats for d, stats in results.items() if stats}
+    summary = merge_camera_stats(to_update) if to_update else {}
+
+    print()
+    print(f"{'Date':<12} {'Meeting':<10} {'QOS people':<12} {'Rows':<8} {'Unmatched':<10}")
+    print("-" * 60)
+    for d in dates:
+        day = str(d)
+        result = summary.get(day, {})
+        print(f"{day:<12} {'yes' if day in found else '-':<10} "
+              f"{len(results.get(day, {})):<12} {result.get('updated', 0):<8} "
+              f"{len(result.get('unmatched', [])):<10}")
+
 def main():
     print("=" * 60)
     print("UPDATE CAMERA DATA IN BIGQUERY")
     print("=" * 60)
 
+    parser = argparse.ArgumentParser(description='Update camera data in daily_reports')
+    parser.add_argument('date', nargs='?', help='Single date (YYYY-MM-DD), default today')
+    parser.add_argument('--from', dest='date_from', help='Range start (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='date_to', help='Range end (YYYY-MM-DD), default = --from')
+    args = parser.parse_args()
+
+    if args.date_from:
+        date_from = datetime.strptime(args.date_from, '%Y-%m-%d').date()
+        date_to = datetime.strptime(args.date_to, '%Y-%m-%d').date() if args.date_to else date_from
+        backfill(date_from, date_to)
+        print_cache_stats()
+        print()
+        print("=" * 60)
+        print("DONE!")
+        print("=" * 60)
+        return
+
     # Get target date
-    if len(sys.argv) > 1:
-        target_date = datetime.strptime(sys.argv[1], '%Y-%m-%d').date()
+    if args.date:
+        target_date = datetime.strptime(args.date, '%Y-%m-%d').date()
     else:
         target_date = date.today()
 
@@ -326,10 +709,10 @@ def main():
     if updated > 0:
         show_report_preview(str(target_date))
 
+    print_cache_stats()
+
     print()
     print("=" * 60)
     print("DONE!")
     print("=" * 60)
 
-if __name__ == '__main__':
-    main()
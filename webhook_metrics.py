@@ -0,0 +1,211 @@
+"""
+PROMETHEUS METRICS FOR THE WEBHOOK (NO EXTRA DEPENDENCY)
+========================================================
+
+WHAT THIS DOES:
+- Counters, gauges and histograms kept in memory, with labels
+- render() -> Prometheus text exposition format (served on /metrics)
+- instrument(stage): decorator timing a function into the stage histogram
+  and counting failures (exception or False return)
+
+WHY:
+- The only signal was print() lines: no way to tell whether slow Zoom
+  deliveries came from parsing, GCS or BigQuery
+- Each observation is one perf_counter() pair, a bisect and a lock:
+  cheap enough to leave on in production
+
+METRICS (see the definitions at the bottom):
+- zoom_webhook_request_seconds        histogram, end-to-end /webhook latency
+- zoom_webhook_stage_seconds{stage}   histogram, parse / GCS / BigQuery
+- zoom_webhook_stage_failures_total{stage}
+- zoom_webhook_events_total{event_type, outcome}
+- zoom_webhook_requests_in_flight     gauge
+- zoom_webhook_spool_bytes / _spool_lag_bytes / _spool_lag_seconds
+                                      gauges, set on scrape (SPOOL_ENABLED)
+"""
+
+from bisect import bisect_left
+from functools import wraps
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+
+# Seconds: 1ms .. 10s (GCS / BigQuery calls sit in the 10ms - 1s range)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # [per-bucket counts..., +Inf count, sum]
+                series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def _render_series(self, key, series):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {series[-1]!r}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# ==============================================================================
+# WEBHOOK METRICS
+# ==============================================================================
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'zoom_webhook_request_seconds', 'End-to-end /webhook request latency'))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'zoom_webhook_stage_seconds', 'Latency of one processing stage', ['stage']))
+STAGE_FAILURES = REGISTRY.register(Counter(
+    'zoom_webhook_stage_failures_total', 'Stage calls that raised or returned a failure', ['stage']))
+EVENTS = REGISTRY.register(Counter(
+    'zoom_webhook_events_total', 'Webhook deliveries by event type and outcome', ['event_type', 'outcome']))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    'zoom_webhook_requests_in_flight', '/webhook requests being handled'))
+SPOOL_BYTES = REGISTRY.register(Gauge(
+    'zoom_webhook_spool_bytes', 'Bytes in local spool segments'))
+SPOOL_LAG_BYTES = REGISTRY.register(Gauge(
+    'zoom_webhook_spool_lag_bytes', 'Spooled bytes not yet delivered to every sink'))
+SPOOL_LAG_SECONDS = REGISTRY.register(Gauge(
+    'zoom_webhook_spool_lag_seconds', 'Age of the oldest spooled event not yet delivered'))
+
+
+def instrument(stage):
+    """
+    Time every call into zoom_webhook_stage_seconds{stage=...}
+
+    A raised exception or a False return counts as a failure
+    (METRICS_ENABLED=false: the function is returned unwrapped)
+    """
+    def decorator(fn):
+        if not METRICS_ENABLED:
+            return fn
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                STAGE_FAILURES.inc(stage=stage)
+                raise
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+            if result is False:
+                STAGE_FAILURES.inc(stage=stage)
+            return result
+        return wrapper
+    return decorator
+
+
+def event_type_label(event):
+    """Bounded label value: unknown event names must not create new series"""
+    if event == 'endpoint.url_validation' or (event.startswith('meeting.') and 'breakout_room' in event):
+        return event
+    return 'other'
@@ -0,0 +1,105 @@
+"""
+PERSISTENT ZOOM API METADATA CACHE
+==================================
+
+WHAT THIS DOES:
+- Small JSON file on disk with expiring entries
+- Used by update_camera_data.py for:
+  - OAuth token: kept until shortly before it expires (~1 hour)
+  - Meeting instances: date -> meeting UUID index (past instances never
+    change, so entries never expire)
+- Counts hits and misses
+
+WHY:
+- Every run asked Zoom for a new token, and downloaded the full
+  /past_meetings/{id}/instances list just to find one date
+- Repeated runs and backfills now skip both round trips
+
+SECURITY:
+- The file holds a live access token: written with 0600 permissions
+"""
+
+from service_log import log
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class ZoomApiCache:
+    """
+    JSON-file cache with per-entry TTL
+
+    USAGE:
+        cache = ZoomApiCache('~/.cache/zoom_tracker/zoom_api_cache.json')
+        value = cache.get('token:abc')           # None if missing/expired
+        cache.set('token:abc', value, ttl=3000)  # ttl=None: never expires
+    """
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        self._entries = self._read()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Value for key (None if missing or expired), counted as hit/miss"""
+        value = self.peek(key)
+        self.count(value is not None)
+        return value
+
+    def peek(self, key):
+        """Value for key without counting (caller decides what a hit is)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry['expires_at'] and entry['expires_at'] <= time.time()):
+                return None
+            return entry['value']
+
+    def count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = {
+                'value': value,
+                'expires_at': time.time() + ttl if ttl else None,
+            }
+            self._write()
+
+    def get_stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self):
+        """Atomic write (temp file + rename), expired entries dropped"""
+        now = time.time()
+        self._entries = {
+            k: e for k, e in self._entries.items()
+            if not e['expires_at'] or e['expires_at'] > now
+        }
+
+        directory = os.path.dirname(self.path) or '.'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix='.zoom_cache_')
+            os.chmod(tmp, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            # Cache is an optimization: never fail the run because of it
+            log(f"\n    Cache write failed ({self.path}): {e}", severity='WARNING',
+                key='cache_write_error', path=self.path, error=str(e))
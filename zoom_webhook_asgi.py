@@ -0,0 +1,180 @@
+"""
+ZOOM WEBHOOK LISTENER - ASYNCIO / ASGI ENTRY POINT
+==================================================
+
+WHAT THIS DOES:
+- Serves the same routes as zoom_webhook_bigquery.py (/, /webhook, /metrics,
+  /test-gcs, /test-bq) with the same parsing, dedup, spool / pipeline and
+  sinks (all imported from there, same environment variables)
+- Writes an event to every sink concurrently (GCS and BigQuery in parallel,
+  not one after the other)
+- Limits in-flight deliveries with ASGI_MAX_CONCURRENCY instead of the
+  gunicorn thread count; above it -> 503 + Retry-After (Zoom redelivers)
+
+WHY:
+- gunicorn --threads 8 caps a container at 8 deliveries, each waiting for
+  GCS and then BigQuery: room reassignments scale Cloud Run out instead of
+  filling the instance
+- The event loop holds hundreds of waiting requests for the cost of one
+  thread
+
+HOW THE SINKS ARE CALLED:
+- The google-cloud clients are blocking; each sink call runs in a thread
+  pool (ASGI_IO_THREADS) while the loop keeps serving
+- No second, async-only GCS/BigQuery client stack to authenticate, warm
+  and keep in sync with the Flask app
+
+HOW TO RUN:
+  uvicorn zoom_webhook_asgi:app --host 0.0.0.0 --port 8080
+  # Cloud Run: --concurrency equal to ASGI_MAX_CONCURRENCY
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from fast_json import dumps
+from webhook_metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, EVENTS, IN_FLIGHT, METRICS_ENABLED,
+    REQUEST_SECONDS, event_type_label,
+)
+import zoom_webhook_bigquery as core
+import asyncio
+import os
+import time
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+ASGI_MAX_CONCURRENCY = int(os.environ.get('ASGI_MAX_CONCURRENCY', 80))  # in-flight POST /webhook
+ASGI_IO_THREADS = int(os.environ.get('ASGI_IO_THREADS', 32))  # blocking sink / client calls
+
+io_executor = ThreadPoolExecutor(max_workers=ASGI_IO_THREADS, thread_name_prefix='asgi-io')
+deliveries = 0  # in-flight POST /webhook (only touched from the event loop)
+
+
+async def run_blocking(fn, *args):
+    """Run a blocking call (GCS, BigQuery, fsync) in the I/O thread pool"""
+    return await asyncio.get_running_loop().run_in_executor(io_executor, fn, *args)
+
+# ==============================================================================
+# HTTP PLUMBING
+# ==============================================================================
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def send_response(send, status, body, headers=None, content_type='application/json'):
+    payload = body.encode('utf-8') if isinstance(body, str) else dumps(body)
+    raw_headers = [
+        (b'content-type', content_type.encode('latin-1')),
+        (b'content-length', str(len(payload)).encode('latin-1')),
+    ]
+    for name, value in (headers or {}).items():
+        raw_headers.append((name.lower().encode('latin-1'), str(value).encode('latin-1')))
+    await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+    await send({'type': 'http.response.body', 'body': payload})
+
+# ==============================================================================
+# WEBHOOK
+# ==============================================================================
+
+async def handle_webhook_event(raw_body):
+    """
+    Process one POSTed webhook event
+
+    RETURNS:
+    - ((body, status, headers), event name, outcome label for metrics)
+    """
+    response, event, outcome, row_data = core.accept_webhook_event(raw_body, datetime.utcnow())
+    if row_data is None:
+        return response, event, outcome
+
+    if core.SPOOL_ENABLED or core.PIPELINE_ENABLED:
+        # Spool append waits for its fsync: off the loop
+        response, outcome = await run_blocking(core.hand_off_event, row_data)
+        return response, event, outcome
+
+    # Every configured sink at once
+    await asyncio.gather(*(run_blocking(write, row_data) for _, write in core.get_event_sinks()))
+    core.observe_event(row_data)
+    return response, event, outcome
+
+
+async def zoom_webhook(receive, send):
+    """POST /webhook: same flow as the Flask app, sinks written concurrently"""
+    global deliveries
+    if deliveries >= ASGI_MAX_CONCURRENCY:
+        core.log("  -> Concurrency limit reached: asking Zoom to retry", severity='WARNING',
+                 key='concurrency_limit')
+        EVENTS.inc(event_type='other', outcome='busy')
+        await send_response(send, 503, {'status': 'busy'},
+                            {'Retry-After': str(core.PIPELINE_RETRY_AFTER_SECS)})
+        return
+
+    deliveries += 1
+    IN_FLIGHT.inc()
+    start = time.perf_counter()
+    event, outcome = '', 'error'
+    try:
+        (body, status, headers), event, outcome = await handle_webhook_event(await read_body(receive))
+        await send_response(send, status, body, headers)
+    finally:
+        deliveries -= 1
+        IN_FLIGHT.dec()
+        REQUEST_SECONDS.observe(time.perf_counter() - start)
+        EVENTS.inc(event_type=event_type_label(event), outcome=outcome)
+
+# ==============================================================================
+# ASGI APP
+# ==============================================================================
+
+async def lifespan(receive, send):
+    """Startup: nothing to do (STARTUP_WARM runs at import); shutdown: finish sink calls"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            # Writers / spool / pipeline close through atexit, as with gunicorn
+            await asyncio.get_running_loop().run_in_executor(None, io_executor.shutdown)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI callable (uvicorn zoom_webhook_asgi:app)"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    method, path = scope['method'], scope['path']
+
+    if path == '/webhook' and method == 'POST':
+        await zoom_webhook(receive, send)
+    elif method != 'GET':
+        await send_response(send, 405, {'status': 'method not allowed'})
+    elif path == '/':
+        await send_response(send, 200, core.health_status())
+    elif path == '/webhook':
+        await send_response(send, 200, core.webhook_info())
+    elif path == '/metrics':
+        if not METRICS_ENABLED:
+            await send_response(send, 404, {'status': 'metrics disabled'})
+        else:
+            await send_response(send, 200, core.render_metrics(), content_type=METRICS_CONTENT_TYPE)
+    elif path in ('/test-gcs', '/test-bq'):
+        body, status = await run_blocking(core.check_gcs if path == '/test-gcs' else core.check_bq)
+        await send_response(send, status, body)
+    else:
+        await send_response(send, 404, {'status': 'not found'})
@@ -12,23 +12,47 @@ WHY GCS + BIGQUERY:
 - BigQuery: Fast queries, transformations, scheduled reports
 
 FIELDS CAPTURED:
-- event_id: Unique ID for each event
+- event_id: Deterministic ID per delivery (Zoom retries get the same ID)
 - event_type: "joined" or "left"
 - event_timestamp: When the event happened
 - participant_name: Who joined/left
 - participant_email: Their email
 - breakout_room_uuid: Which room
 - raw_payload: Full JSON for debugging
+
+COLD START:
+- google.cloud.bigquery / storage are imported when their client is first
+  needed (~0.5s of imports skipped by sinks that do not use them)
+- STARTUP_WARM=true: clients are created and their connections opened at
+  import; with gunicorn --preload (Dockerfile) that is before the port opens
+- Timings are reported under 'startup' in the health check
 """
 
+import time
+_MODULE_START = time.perf_counter()  # startup_timings['module_import_ms']
+
 from flask import Flask, request, jsonify
-from google.cloud import bigquery
-from google.cloud import storage
 from datetime import datetime
+from bq_batch_writer import BigQueryBatchWriter
+from event_dedup import EventDedupCache, idempotency_key, recent_event_ids
+from event_spool import EventSpool
+from fast_json import EncodedRow, encode_row, loads
+from gcs_segment_writer import GcsSegmentWriter
+from local_event_store import LocalEventStore
+from online_sessionizer import OnlineSessionizer
+from service_log import log
+from sink_pipeline import SinkPipeline
+from webhook_metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, EVENTS, IN_FLIGHT, METRICS_ENABLED,
+    REGISTRY, REQUEST_SECONDS, SPOOL_BYTES, SPOOL_LAG_BYTES, SPOOL_LAG_SECONDS,
+    event_type_label, instrument,
+)
+import atexit
 import hmac
 import hashlib
 import json
 import os
+import threading
 import uuid
 
 # ==============================================================================
@@ -45,35 +69,377 @@ GCP_PROJECT_ID = os.environ.get('GCP_PROJECT_ID', 'your-project-id')
 GCS_BUCKET = os.environ.get('GCS_BUCKET', 'zoom-tracker-data')
 GCS_RAW_PREFIX = os.environ.get('GCS_RAW_PREFIX', 'raw')
 
+# GCS write mode:
+# - individual: one JSON file per event (raw/<date>/<event_id>.json)
+# - segments:   buffered JSONL segments (raw/<date>/segments/*.jsonl)
+GCS_WRITE_MODE = os.environ.get('GCS_WRITE_MODE', 'individual')
+GCS_SEGMENT_MAX_BYTES = int(os.environ.get('GCS_SEGMENT_MAX_BYTES', 8 * 1024 * 1024))
+GCS_SEGMENT_MAX_AGE_SECS = float(os.environ.get('GCS_SEGMENT_MAX_AGE_SECS', 60))
+GCS_SEGMENT_GZIP = os.environ.get('GCS_SEGMENT_GZIP', 'false').lower() == 'true'
+
 # BigQuery Configuration
 BQ_DATASET = os.environ.get('BQ_DATASET', 'zoom_tracker')
 BQ_TABLE = os.environ.get('BQ_TABLE', 'raw_events')
+BQ_TABLE_ID = f"{GCP_PROJECT_ID}.{BQ_DATASET}.{BQ_TABLE}"
+
+# Where events are written (comma-separated):
+# - gcs, bigquery: cloud sinks (default)
+# - local: embedded SQLite / DuckDB store (on-prem, dev), see local_event_store.py
+EVENT_SINKS = [s.strip() for s in os.environ.get('EVENT_SINKS', 'gcs,bigquery').split(',') if s.strip()]
+LOCAL_STORE_PATH = os.environ.get('LOCAL_STORE_PATH', 'zoom_events.db')
+LOCAL_STORE_BACKEND = os.environ.get('LOCAL_STORE_BACKEND', 'sqlite')
+
+# BigQuery micro-batching (one multi-row insert instead of one insert per event)
+BQ_BATCH_ENABLED = os.environ.get('BQ_BATCH_ENABLED', 'false').lower() == 'true'
+BQ_BATCH_MAX_ROWS = int(os.environ.get('BQ_BATCH_MAX_ROWS', 500))
+BQ_BATCH_MAX_BYTES = int(os.environ.get('BQ_BATCH_MAX_BYTES', 5 * 1024 * 1024))
+BQ_BATCH_MAX_LATENCY_MS = int(os.environ.get('BQ_BATCH_MAX_LATENCY_MS', 1000))
+
+# Background pipeline (acknowledge Zoom first, write to sinks from a worker pool)
+PIPELINE_ENABLED = os.environ.get('PIPELINE_ENABLED', 'false').lower() == 'true'
+PIPELINE_MAX_QUEUE = int(os.environ.get('PIPELINE_MAX_QUEUE', 1000))
+PIPELINE_WORKERS = int(os.environ.get('PIPELINE_WORKERS', 4))
+PIPELINE_RETRY_AFTER_SECS = int(os.environ.get('PIPELINE_RETRY_AFTER_SECS', 5))
+
+# Online sessionizer (room visits emitted as soon as the LEAVE arrives)
+ROOM_VISITS_ENABLED = os.environ.get('ROOM_VISITS_ENABLED', 'false').lower() == 'true'
+BQ_VISITS_TABLE = os.environ.get('BQ_VISITS_TABLE', 'room_visits')
+ROOM_VISITS_STALE_SECS = int(os.environ.get('ROOM_VISITS_STALE_SECS', 4 * 3600))
+
+# Drop Zoom retries of an event already seen by this process
+DEDUP_ENABLED = os.environ.get('DEDUP_ENABLED', 'false').lower() == 'true'
+DEDUP_MAX_ENTRIES = int(os.environ.get('DEDUP_MAX_ENTRIES', 100000))
+DEDUP_TTL_SECS = int(os.environ.get('DEDUP_TTL_SECS', 3600))
+DEDUP_WARM_MINUTES = int(os.environ.get('DEDUP_WARM_MINUTES', 10))  # 0 = no warm-up
+
+# Durable local spool (acknowledge once on disk, a replayer delivers to the sinks)
+SPOOL_ENABLED = os.environ.get('SPOOL_ENABLED', 'false').lower() == 'true'
+SPOOL_DIR = os.environ.get('SPOOL_DIR', 'spool')
+SPOOL_SEGMENT_MAX_BYTES = int(os.environ.get('SPOOL_SEGMENT_MAX_BYTES', 64 * 1024 * 1024))
+SPOOL_FSYNC_MS = int(os.environ.get('SPOOL_FSYNC_MS', 10))  # 0 = no fsync (OS page cache only)
+SPOOL_REPLAY_BATCH = int(os.environ.get('SPOOL_REPLAY_BATCH', 500))
+SPOOL_REPLAY_WORKERS = int(os.environ.get('SPOOL_REPLAY_WORKERS', 8))
+SPOOL_MAX_BACKOFF_SECS = int(os.environ.get('SPOOL_MAX_BACKOFF_SECS', 60))
+# Short replay batches wait this long for more events (segments mode: fewer, larger GCS segments)
+SPOOL_REPLAY_WAIT_MS = int(os.environ.get('SPOOL_REPLAY_WAIT_MS', 5000 if GCS_WRITE_MODE == 'segments' else 0))
+
+# Cold start: create + warm the clients at import instead of on the first event
+STARTUP_WARM = os.environ.get('STARTUP_WARM', 'false').lower() == 'true'
 
 # Clients (initialized lazily)
 bq_client = None
 gcs_client = None
+gcs_bucket = None
+bq_batch_writer = None
+gcs_segment_writer = None
+sink_pipeline = None
+visits_writer = None
+online_sessionizer = None
+event_dedup = None
+local_store = None
+local_batch_writer = None
+event_sinks = None
+event_spool = None
+event_spool_lock = threading.Lock()
+event_sinks_lock = threading.Lock()
+bq_batch_writer_lock = threading.Lock()
+online_sessionizer_lock = threading.Lock()
+local_batch_writer_lock = threading.Lock()
+gcs_segment_writer_lock = threading.Lock()
+event_dedup_lock = threading.Lock()
+sink_pipeline_lock = threading.Lock()
+
+# Milliseconds spent on imports, client creation and warm-up (health check)
+startup_timings = {}
+
+def record_startup(name, start):
+    startup_timings[f"{name}_ms"] = round((time.perf_counter() - start) * 1000, 1)
 
 def get_bq_client():
-    """Get or create BigQuery client"""
+    """Get or create BigQuery client (imports google.cloud.bigquery on first use)"""
     global bq_client
     if bq_client is None:
+        start = time.perf_counter()
+        from google.cloud import bigquery
+        record_startup('bigquery_import', start)
+
+        start = time.perf_counter()
         bq_client = bigquery.Client(project=GCP_PROJECT_ID)
+        record_startup('bigquery_client', start)
     return bq_client
 
 def get_gcs_client():
-    """Get or create GCS client"""
+    """Get or create GCS client (imports google.cloud.storage on first use)"""
     global gcs_client
     if gcs_client is None:
+        start = time.perf_counter()
+        from google.cloud import storage
+        record_startup('storage_import', start)
+
+        start = time.perf_counter()
         gcs_client = storage.Client(project=GCP_PROJECT_ID)
+        record_startup('storage_client', start)
     return gcs_client
 
+def get_gcs_bucket():
+    """Bucket handle, built once (no API call) and shared by every write"""
+    global gcs_bucket
+    if gcs_bucket is None:
+        gcs_bucket = get_gcs_client().bucket(GCS_BUCKET)
+    return gcs_bucket
+
+def warm_up():
+    """
+    Create the clients the configured sinks need and make one cheap call
+    with each, in parallel: credentials are fetched and the HTTPS
+    connection is opened here instead of on the first webhook
+
+    Failures are logged only; the lazy path still works afterwards
+    """
+    start = time.perf_counter()
+    calls = []
+    if 'gcs' in EVENT_SINKS or DEDUP_ENABLED:
+        # Object lookup: needs only object read access; a missing object is fine
+        calls.append(('warm_gcs', lambda: get_gcs_bucket().get_blob(f"{GCS_RAW_PREFIX}/_warmup")))
+    if 'bigquery' in EVENT_SINKS or ROOM_VISITS_ENABLED:
+        calls.append(('warm_bigquery', lambda: get_bq_client().get_table(BQ_TABLE_ID)))
+
+    def run(name, call):
+        call_start = time.perf_counter()
+        try:
+            call()
+        except Exception as e:
+            log(f"  -> Warm-up {name} Error: {e}", severity='WARNING', key='warm_up_error', error=str(e))
+        record_startup(name, call_start)
+
+    threads = [threading.Thread(target=run, args=call, daemon=True) for call in calls]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    record_startup('warm_total', start)
+
+def get_bq_batch_writer():
+    """Get or create the per-process BigQuery batch writer"""
+    global bq_batch_writer
+    if bq_batch_writer is not None:
+        return bq_batch_writer
+    # Locked: rows split over several writers lose the batching, and only
+    # the global one is flushed on shutdown
+    with bq_batch_writer_lock:
+        if bq_batch_writer is None:
+            bq_batch_writer = BigQueryBatchWriter(
+                get_bq_client,
+                BQ_TABLE_ID,
+                max_rows=BQ_BATCH_MAX_ROWS,
+                max_bytes=BQ_BATCH_MAX_BYTES,
+                max_latency=BQ_BATCH_MAX_LATENCY_MS / 1000
+            )
+            # Flush rows still waiting when gunicorn / Cloud Run stops the worker
+            atexit.register(bq_batch_writer.close)
+    return bq_batch_writer
+
+def get_gcs_segment_writer():
+    """Get or create the per-process GCS segment writer"""
+    global gcs_segment_writer
+    if gcs_segment_writer is not None:
+        return gcs_segment_writer
+    # Locked: an extra writer makes smaller segments, and its rows are never
+    # uploaded by the shutdown close()
+    with gcs_segment_writer_lock:
+        if gcs_segment_writer is None:
+            gcs_segment_writer = GcsSegmentWriter(
+                get_gcs_bucket,
+                GCS_RAW_PREFIX,
+                max_bytes=GCS_SEGMENT_MAX_BYTES,
+                max_age=GCS_SEGMENT_MAX_AGE_SECS,
+                use_gzip=GCS_SEGMENT_GZIP,
+                # With the spool, the replayer retries a failed segment's rows
+                requeue_failed=not SPOOL_ENABLED
+            )
+            # Upload the last partial segment when the worker stops
+            atexit.register(gcs_segment_writer.close)
+    return gcs_segment_writer
+
+def get_online_sessionizer():
+    """
+    Get or create the online sessionizer
+
+    Closed visits go to the room_visits table through their own batch writer
+    (visits close in bursts too, when rooms are reassigned)
+    """
+    global visits_writer, online_sessionizer
+    if online_sessionizer is not None:
+        return online_sessionizer
+    # Locked: two sessionizers would each hold half of the open visits
+    with online_sessionizer_lock:
+        if online_sessionizer is None:
+            visits_writer = BigQueryBatchWriter(
+                get_bq_client,
+                f"{GCP_PROJECT_ID}.{BQ_DATASET}.{BQ_VISITS_TABLE}",
+                max_rows=BQ_BATCH_MAX_ROWS,
+                max_bytes=BQ_BATCH_MAX_BYTES,
+                max_latency=BQ_BATCH_MAX_LATENCY_MS / 1000
+            )
+            atexit.register(visits_writer.close)
+            online_sessionizer = OnlineSessionizer(
+                visits_writer.submit,
+                stale_after=ROOM_VISITS_STALE_SECS
+            )
+            atexit.register(online_sessionizer.close)
+    return online_sessionizer
+
+def get_local_batch_writer():
+    """
+    Get or create the local store and its batch writer
+
+    The store speaks insert_rows_json like bigquery.Client, so the same
+    BigQueryBatchWriter turns events into multi-row transactions
+    """
+    global local_store, local_batch_writer
+    if local_batch_writer is not None:
+        return local_batch_writer
+    # Locked: one connection and one writer per process
+    with local_batch_writer_lock:
+        if local_batch_writer is None:
+            local_store = LocalEventStore(LOCAL_STORE_PATH, LOCAL_STORE_BACKEND)
+            local_batch_writer = BigQueryBatchWriter(
+                lambda: local_store,
+                'raw_events',
+                max_rows=BQ_BATCH_MAX_ROWS,
+                max_bytes=BQ_BATCH_MAX_BYTES,
+                max_latency=BQ_BATCH_MAX_LATENCY_MS / 1000
+            )
+            atexit.register(local_store.close)
+            atexit.register(local_batch_writer.close)
+    return local_batch_writer
+
+def get_event_dedup():
+    """
+    Get or create the duplicate-event cache
+
+    Warm-up from the last DEDUP_WARM_MINUTES of GCS segments runs in the
+    background, so the first request does not wait for the listing
+    (segments mode only: see event_dedup.recent_event_ids)
+    """
+    global event_dedup
+    if event_dedup is not None:
+        return event_dedup
+    # Locked: entries added to a losing second cache would be dropped
+    with event_dedup_lock:
+        if event_dedup is None:
+            dedup = EventDedupCache(max_entries=DEDUP_MAX_ENTRIES, ttl=DEDUP_TTL_SECS)
+            if DEDUP_WARM_MINUTES > 0 and GCS_WRITE_MODE == 'segments':
+                def warm():
+                    try:
+                        dedup.warm(recent_event_ids(get_gcs_bucket(), GCS_RAW_PREFIX, DEDUP_WARM_MINUTES))
+                    except Exception as e:
+                        log(f"  -> Dedup warm-up Error: {e}", severity='ERROR', key='dedup_warm_error')
+                threading.Thread(target=warm, name='dedup-warm', daemon=True).start()
+            event_dedup = dedup
+    return event_dedup
+
+def get_event_sinks():
+    """
+    (name, write function) for every sink in EVENT_SINKS
+
+    Also creates the sinks' background writers, so they exist before the
+    pipeline (see get_sink_pipeline)
+    """
+    global event_sinks
+    if event_sinks is not None:
+        return event_sinks
+    with event_sinks_lock:
+        if event_sinks is not None:
+            return event_sinks
+
+        sinks = []
+        for name in EVENT_SINKS:
+            if name == 'gcs':
+                if GCS_WRITE_MODE == 'segments':
+                    get_gcs_segment_writer()
+                sinks.append(('gcs', write_event_to_gcs))
+            elif name == 'bigquery':
+                if BQ_BATCH_ENABLED:
+                    get_bq_batch_writer()
+                sinks.append(('bigquery', write_event_to_bigquery))
+            elif name == 'local':
+                get_local_batch_writer()
+                sinks.append(('local', write_to_local_store))
+            else:
+                raise ValueError(f"Unknown sink in EVENT_SINKS: {name} (gcs, bigquery, local)")
+        event_sinks = sinks
+    return event_sinks
+
+def get_sink_pipeline():
+    """Get or create the background sink pipeline"""
+    global sink_pipeline
+    if sink_pipeline is not None:
+        return sink_pipeline
+    # Locked: a second pipeline would double the queue bound and the workers
+    with sink_pipeline_lock:
+        if sink_pipeline is None:
+            # get_event_sinks() creates the batch/segment writers first: atexit
+            # runs in reverse order, so the pipeline drains into the writers
+            # before they close
+            sink_pipeline = SinkPipeline(
+                get_event_sinks(),
+                max_queue=PIPELINE_MAX_QUEUE,
+                workers=PIPELINE_WORKERS
+            )
+            atexit.register(sink_pipeline.close)
+    return sink_pipeline
+
+def get_event_spool():
+    """
+    Get or create the durable spool; its replayer writes to EVENT_SINKS
+
+    Segments left by a previous process are replayed from the checkpoint
+    as soon as the spool starts
+    """
+    global event_spool
+    if event_spool is not None:
+        return event_spool
+    # Locked: two spools on the same directory would corrupt each other
+    with event_spool_lock:
+        if event_spool is None:
+            # Sinks (and their writers) first: atexit closes the spool before them
+            sinks = get_event_sinks()
+            # Segments mode: a GCS row counts once its segment is uploaded
+            # (the Future from append), so each replayed batch is uploaded
+            # right away instead of after GCS_SEGMENT_MAX_AGE_SECS
+            flushers = [gcs_segment_writer.flush] if gcs_segment_writer is not None else []
+            event_spool = EventSpool(
+                SPOOL_DIR,
+                sinks,
+                segment_max_bytes=SPOOL_SEGMENT_MAX_BYTES,
+                fsync_interval=SPOOL_FSYNC_MS / 1000,
+                replay_batch=SPOOL_REPLAY_BATCH,
+                replay_workers=SPOOL_REPLAY_WORKERS,
+                max_backoff=SPOOL_MAX_BACKOFF_SECS,
+                flushers=flushers,
+                batch_wait=SPOOL_REPLAY_WAIT_MS / 1000
+            )
+            atexit.register(event_spool.close)
+    return event_spool
+
+@instrument('spool_append')
+def spool_event(event_data):
+    """Append to the spool; False = not durable, Zoom must retry"""
+    try:
+        return get_event_spool().append(event_data)
+    except Exception as e:
+        log(f"  -> Spool Error: {e}", severity='ERROR', key='spool_error', error=str(e))
+        return False
+
 # ==============================================================================
 # GCS FUNCTIONS
 # ==============================================================================
 
+@instrument('write_to_gcs')
 def write_to_gcs(event_data):
     """
-    Write event to Google Cloud Storage
+    Write event to Google Cloud Storage as JSON Lines segments
 
     WHY GCS:
     - Cheap storage ($0.02/GB/month)
@@ -82,40 +448,21 @@ def write_to_gcs(event_data):
     - Batch load to BigQuery is FREE (streaming costs $$$)
 
     FILE STRUCTURE:
-    gs://bucket/raw/2026-02-03/events.jsonl
+    gs://bucket/raw/2026-02-03/segments/<writer>-000001.jsonl
     - One JSON object per line (JSON Lines format)
     - Easy to load into BigQuery
+    - Events are buffered in memory and uploaded as new, immutable segments
+      (no more download + append + re-upload of one growing daily file)
+    - compose_daily_file() can merge a day into raw/2026-02-03/events.jsonl
     """
     try:
-        client = get_gcs_client()
-        bucket = client.bucket(GCS_BUCKET)
-
-        # Create file path: raw/YYYY-MM-DD/events.jsonl
-        today = datetime.utcnow().strftime('%Y-%m-%d')
-        blob_path = f"{GCS_RAW_PREFIX}/{today}/events.jsonl"
-
-        blob = bucket.blob(blob_path)
-
-        # Append to existing file or create new
-        # Using JSON Lines format (one JSON per line)
-        json_line = json.dumps(event_data) + '\n'
-
-        # Download existing content if file exists, then append
-        try:
-            existing_content = blob.download_as_text()
-        except:
-            existing_content = ''
-
-        new_content = existing_content + json_line
-        blob.upload_from_string(new_content, content_type='application/json')
-
-        print(f"  -> GCS: Written to {blob_path}")
-        return True
+        return get_gcs_segment_writer().append(event_data)
 
     except Exception as e:
-        print(f"  -> GCS Error: {e}")
+        log(f"  -> GCS Error: {e}", severity='ERROR', key='gcs_error', error=str(e))
         return False
 
+@instrument('write_to_gcs_individual')
 def write_to_gcs_individual(event_data):
     """
     Alternative: Write each event as individual file
@@ -127,33 +474,40 @@ def write_to_gcs_individual(event_data):
 
     FILE STRUCTURE:
     gs://bucket/raw/2026-02-03/event_uuid.json
+    - One compact line (also valid JSON Lines for load jobs)
+    - Path comes from the row's gcs_path (computed once in parse_zoom_event)
     """
     try:
-        client = get_gcs_client()
-        bucket = client.bucket(GCS_BUCKET)
-
-        # Create unique file path
-        today = datetime.utcnow().strftime('%Y-%m-%d')
-        event_id = event_data.get('event_id', str(uuid.uuid4()))
-        blob_path = f"{GCS_RAW_PREFIX}/{today}/{event_id}.json"
+        bucket = get_gcs_bucket()
+
+        bucket_prefix = f"gs://{GCS_BUCKET}/"
+        gcs_path = event_data.get('gcs_path', '')
+        if gcs_path.startswith(bucket_prefix) and gcs_path.endswith('.json'):
+            blob_path = gcs_path[len(bucket_prefix):]
+        else:
+            # Create unique file path
+            today = datetime.utcnow().strftime('%Y-%m-%d')
+            event_id = event_data.get('event_id', str(uuid.uuid4()))
+            blob_path = f"{GCS_RAW_PREFIX}/{today}/{event_id}.json"
 
         blob = bucket.blob(blob_path)
         blob.upload_from_string(
-            json.dumps(event_data, indent=2),
+            encode_row(event_data),
             content_type='application/json'
         )
 
-        print(f"  -> GCS: {blob_path}")
+        log(f"  -> GCS: {blob_path}", key='gcs_ok', gcs_path=blob_path)
         return True
 
     except Exception as e:
-        print(f"  -> GCS Error: {e}")
+        log(f"  -> GCS Error: {e}", severity='ERROR', key='gcs_error', error=str(e))
         return False
 
 # ==============================================================================
 # BIGQUERY FUNCTIONS
 # ==============================================================================
 
+@instrument('write_to_bigquery')
 def write_to_bigquery(event_data):
     """
     Stream event to BigQuery for immediate querying
@@ -167,32 +521,103 @@ def write_to_bigquery(event_data):
     For high volume, use batch load from GCS instead
     """
     try:
-        client = get_bq_client()
-        table_id = f"{GCP_PROJECT_ID}.{BQ_DATASET}.{BQ_TABLE}"
-
-        errors = client.insert_rows_json(table_id, [event_data])
+        errors = get_bq_client().insert_rows_json(BQ_TABLE_ID, [event_data])
 
         if errors:
-            print(f"  -> BigQuery Error: {errors}")
+            log(f"  -> BigQuery Error: {errors}", severity='ERROR', key='bigquery_error', errors=errors)
             return False
 
-        print(f"  -> BigQuery: OK")
+        log("  -> BigQuery: OK", key='bigquery_ok')
         return True
 
     except Exception as e:
-        print(f"  -> BigQuery Error: {e}")
+        log(f"  -> BigQuery Error: {e}", severity='ERROR', key='bigquery_error', error=str(e))
         return False
 
+def write_event_to_gcs(event_data):
+    """Write to GCS with the configured mode (segments or individual files)"""
+    if GCS_WRITE_MODE == 'segments':
+        return write_to_gcs(event_data)
+    return write_to_gcs_individual(event_data)
+
+@instrument('write_to_bigquery_batched')
+def write_to_bigquery_batched(event_data):
+    """
+    Queue event for the next multi-row BigQuery insert
+
+    WHY BATCH:
+    - Room reassignments send hundreds of events within seconds
+    - One insert_rows_json call per batch instead of per event
+    - Returns immediately, errors are reported per row when the batch lands
+
+    RETURNS:
+    - Future with the BigQuery errors for this row ([] = OK)
+    """
+    event_id = event_data.get('event_id')
+
+    def report(future):
+        try:
+            errors = future.result()
+        except Exception as e:
+            log(f"  -> BigQuery Error ({event_id}): {e}", severity='ERROR',
+                key='bigquery_error', event_id=event_id, error=str(e))
+            return
+        if errors:
+            log(f"  -> BigQuery Error ({event_id}): {errors}", severity='ERROR',
+                key='bigquery_error', event_id=event_id, errors=errors)
+
+    future = get_bq_batch_writer().submit(event_data)
+    future.add_done_callback(report)
+    return future
+
+def write_event_to_bigquery(event_data):
+    """Write to BigQuery with the configured mode (batched or one insert)"""
+    if BQ_BATCH_ENABLED:
+        return write_to_bigquery_batched(event_data)
+    return write_to_bigquery(event_data)
+
+# ==============================================================================
+# LOCAL STORE
+# ==============================================================================
+
+@instrument('write_to_local_store')
+def write_to_local_store(event_data):
+    """
+    Queue event for the next local store transaction (EVENT_SINKS=local)
+
+    RETURNS:
+    - Future with the errors for this row ([] = OK)
+    """
+    event_id = event_data.get('event_id')
+
+    def report(future):
+        try:
+            future.result()
+        except Exception as e:
+            log(f"  -> Local store Error ({event_id}): {e}", severity='ERROR',
+                key='local_store_error', event_id=event_id, error=str(e))
+
+    future = get_local_batch_writer().submit(event_data)
+    future.add_done_callback(report)
+    return future
+
 # ==============================================================================
 # EVENT PARSING
 # ==============================================================================
 
-def parse_zoom_event(data):
+@instrument('parse_zoom_event')
+def parse_zoom_event(data, raw_body=None, received_at=None):
     """
     Parse Zoom webhook payload into structured format
 
+    HOT PATH:
+    - raw_body: the request bytes, stored unchanged as raw_payload
+      (no re-serialization of the payload)
+    - received_at: the request's UTC time, so the clock is read once
+    - Returns an EncodedRow: serialized once, shared by every sink
+
     FIELDS EXTRACTED:
-    - event_id: UUID we generate for uniqueness
+    - event_id: Deterministic UUID from the payload (see event_dedup)
     - event_date: Date of the event (YYYY-MM-DD) - for filtering reports
     - event_type: Full Zoom event name
     - event_timestamp: When Zoom sent the event
@@ -214,19 +639,33 @@ def parse_zoom_event(data):
 
     action = 'JOIN' if 'joined' in event else 'LEAVE'
 
+    received_at = received_at or datetime.utcnow()
+    received_iso = received_at.isoformat()
+    today = received_iso[:10]
+
     event_ts = data.get('event_ts', 0)
     if event_ts:
         event_dt = datetime.fromtimestamp(event_ts / 1000)
         event_datetime = event_dt.isoformat()
-        event_date = event_dt.strftime('%Y-%m-%d')
+        event_date = event_datetime[:10]
     else:
-        event_datetime = datetime.utcnow().isoformat()
-        event_date = datetime.utcnow().strftime('%Y-%m-%d')
+        event_datetime = received_iso
+        event_date = today
 
-    event_id = str(uuid.uuid4())
-    today = datetime.utcnow().strftime('%Y-%m-%d')
+    event_id = idempotency_key(data)
 
-    return {
+    if GCS_WRITE_MODE == 'segments':
+        # Segment name isn't known until upload: point at the day's segments
+        gcs_path = f"gs://{GCS_BUCKET}/{GCS_RAW_PREFIX}/{today}/segments/"
+    else:
+        gcs_path = f"gs://{GCS_BUCKET}/{GCS_RAW_PREFIX}/{today}/{event_id}.json"
+
+    if raw_body is not None:
+        raw_payload = raw_body.decode('utf-8') if isinstance(raw_body, bytes) else raw_body
+    else:
+        raw_payload = json.dumps(data)
+
+    return EncodedRow({
         'event_id': event_id,
         'event_date': event_date,  # NEW: Date field for easy filtering
         'event_type': event,
@@ -238,58 +677,67 @@ def parse_zoom_event(data):
         'participant_email': participant.get('email', ''),
         'breakout_room_uuid': obj.get('breakout_room_uuid', ''),
         'action': action,
-        'raw_payload': json.dumps(data),
-        'inserted_at': datetime.utcnow().isoformat(),
-        'gcs_path': f"gs://{GCS_BUCKET}/{GCS_RAW_PREFIX}/{today}/{event_id}.json"
-    }
+        'raw_payload': raw_payload,
+        'inserted_at': received_iso,
+        'gcs_path': gcs_path
+    })
 
 # ==============================================================================
-# WEBHOOK ENDPOINTS
+# REQUEST HANDLING (shared with the ASGI entry point, zoom_webhook_asgi.py)
 # ==============================================================================
 
-@app.route('/', methods=['GET'])
-def health_check():
-    """Health check endpoint for Cloud Run"""
-    return jsonify({
+def health_status():
+    """Body of the health check"""
+    return {
         'status': 'running',
         'service': 'Zoom Webhook → GCS + BigQuery',
         'config': {
             'project': GCP_PROJECT_ID,
             'bucket': GCS_BUCKET,
             'dataset': BQ_DATASET,
-            'table': BQ_TABLE
+            'table': BQ_TABLE,
+            'gcs_write_mode': GCS_WRITE_MODE,
+            'sinks': EVENT_SINKS
         },
+        'bq_batch': get_bq_batch_writer().get_stats() if BQ_BATCH_ENABLED else None,
+        'pipeline': get_sink_pipeline().get_stats() if PIPELINE_ENABLED else None,
+        'spool': get_event_spool().get_stats() if SPOOL_ENABLED else None,
+        'gcs_segments': get_gcs_segment_writer().get_stats() if GCS_WRITE_MODE == 'segments' else None,
+        'room_visits': get_online_sessionizer().get_stats() if ROOM_VISITS_ENABLED else None,
+        'dedup': get_event_dedup().get_stats() if DEDUP_ENABLED else None,
+        'local_store': local_store.get_stats() if local_store is not None else None,
+        'startup': startup_timings,
         'timestamp': datetime.utcnow().isoformat()
-    }), 200
+    }
 
-@app.route('/webhook', methods=['GET', 'POST'])
-def zoom_webhook():
+def webhook_info():
+    """Body of GET /webhook"""
+    return {
+        'status': 'Webhook ready',
+        'endpoints': {
+            'webhook': '/webhook (POST)',
+            'health': '/ (GET)',
+            'metrics': '/metrics (GET)',
+            'test_gcs': '/test-gcs (GET)',
+            'test_bq': '/test-bq (GET)'
+        }
+    }
+
+def accept_webhook_event(raw_body, received_at):
     """
-    Main webhook endpoint
+    Everything before the sink writes: parse, validate, dedup
 
-    FLOW:
-    1. Receive event from Zoom
-    2. Validate (for URL validation challenge)
-    3. Parse event data
-    4. Write to GCS (raw backup)
-    5. Stream to BigQuery (immediate query)
-    6. Return success to Zoom
+    RETURNS:
+    - (response, event name, outcome label, row to deliver or None)
+    - response = (body dict, status, headers); only final when the row is None
     """
-    if request.method == 'GET':
-        return jsonify({
-            'status': 'Webhook ready',
-            'endpoints': {
-                'webhook': '/webhook (POST)',
-                'health': '/ (GET)',
-                'test_gcs': '/test-gcs (GET)',
-                'test_bq': '/test-bq (GET)'
-            }
-        }), 200
-
-    data = request.json
+    try:
+        data = loads(raw_body)
+    except ValueError:
+        return ({'status': 'invalid JSON'}, 400, {}), '', 'invalid', None
     event = data.get('event', '')
 
-    print(f"\n[{datetime.utcnow()}] Event: {event}")
+    log(f"\n[{received_at}] Event: {event}", key='event', event_type=event)
 
     # Handle Zoom URL validation
     if event == 'endpoint.url_validation':
@@ -300,62 +748,204 @@ def zoom_webhook():
             digestmod=hashlib.sha256
         ).hexdigest()
 
-        print("  -> URL validation: OK")
-        return jsonify({
+        log("  -> URL validation: OK", key='url_validation')
+        return ({
             'plainToken': plain_token,
             'encryptedToken': encrypted_token
-        }), 200
+        }, 200, {}), event, 'validated', None
 
     # Process breakout room events
-    if 'breakout_room' in event:
-        row_data = parse_zoom_event(data)
+    if 'breakout_room' not in event:
+        return ({'status': 'success'}, 200, {}), event, 'ignored', None
 
-        print(f"  -> {row_data['action']}: {row_data['participant_name']}")
-        print(f"  -> Room: {row_data['breakout_room_uuid'][:20]}...")
+    row_data = parse_zoom_event(data, raw_body, received_at)
 
-        # Write to GCS (raw backup) - using individual files
-        write_to_gcs_individual(row_data)
+    log(f"  -> {row_data['action']}: {row_data['participant_name']}\n"
+        f"  -> Room: {row_data['breakout_room_uuid'][:20]}...",
+        key='event_parsed', event_id=row_data['event_id'], action=row_data['action'],
+        participant=row_data['participant_name'], room=row_data['breakout_room_uuid'])
 
-        # Stream to BigQuery (immediate query)
-        write_to_bigquery(row_data)
+    # Zoom retry of an event we already accepted: nothing to write
+    if DEDUP_ENABLED and get_event_dedup().check_and_add(row_data['event_id']):
+        log("  -> Duplicate: dropped", key='duplicate', event_id=row_data['event_id'])
+        return ({'status': 'duplicate'}, 200, {}), event, 'duplicate', None
 
-    return jsonify({'status': 'success'}), 200
+    return ({'status': 'success'}, 200, {}), event, 'written', row_data
 
-# ==============================================================================
-# TEST ENDPOINTS
-# ==============================================================================
+def observe_event(row_data):
+    """
+    Open/close the room visit in memory (emits finished visits)
 
-@app.route('/test-gcs', methods=['GET'])
-def test_gcs():
-    """Test GCS connection"""
+    Only once the event is accepted: a 503'd event comes back as a retry,
+    and observing it twice would open the visit twice
+    """
+    if ROOM_VISITS_ENABLED:
+        get_online_sessionizer().observe(row_data)
+
+def busy_response(row_data):
+    """503 + Retry-After; the event is not accepted, so its retry is not a duplicate"""
+    if DEDUP_ENABLED:
+        get_event_dedup().forget(row_data['event_id'])
+    return {'status': 'busy'}, 503, {'Retry-After': str(PIPELINE_RETRY_AFTER_SECS)}
+
+def hand_off_event(row_data):
+    """
+    SPOOL_ENABLED / PIPELINE_ENABLED: accept the event for background delivery
+
+    RETURNS:
+    - (response, outcome label)
+    """
+    if SPOOL_ENABLED:
+        # Acknowledge once durable, the replayer delivers to the sinks
+        if not spool_event(row_data):
+            return busy_response(row_data), 'busy'
+        log("  -> Spooled", key='spooled')
+        observe_event(row_data)
+        return ({'status': 'success'}, 200, {}), 'spooled'
+
+    # Acknowledge now, workers write to GCS + BigQuery
+    if not get_sink_pipeline().submit(row_data):
+        log("  -> Queue full: asking Zoom to retry", severity='WARNING', key='queue_full')
+        return busy_response(row_data), 'busy'
+    log("  -> Queued", key='queued')
+    observe_event(row_data)
+    return ({'status': 'success'}, 200, {}), 'queued'
+
+def check_gcs():
+    """Test GCS connection -> (body, status)"""
     try:
-        client = get_gcs_client()
-        bucket = client.bucket(GCS_BUCKET)
-        blob = bucket.blob('test/connection_test.txt')
+        blob = get_gcs_bucket().blob('test/connection_test.txt')
         blob.upload_from_string(f'Test at {datetime.utcnow().isoformat()}')
-        return jsonify({'status': 'GCS OK', 'bucket': GCS_BUCKET}), 200
+        return {'status': 'GCS OK', 'bucket': GCS_BUCKET}, 200
     except Exception as e:
-        return jsonify({'status': 'GCS Error', 'error': str(e)}), 500
+        return {'status': 'GCS Error', 'error': str(e)}, 500
 
-@app.route('/test-bq', methods=['GET'])
-def test_bq():
-    """Test BigQuery connection"""
+def check_bq():
+    """Test BigQuery connection -> (body, status)"""
     try:
         client = get_bq_client()
         query = f"SELECT COUNT(*) as count FROM `{GCP_PROJECT_ID}.{BQ_DATASET}.{BQ_TABLE}`"
         result = list(client.query(query).result())
-        return jsonify({
+        return {
             'status': 'BigQuery OK',
             'table': f'{BQ_DATASET}.{BQ_TABLE}',
             'row_count': result[0]['count']
-        }), 200
+        }, 200
     except Exception as e:
-        return jsonify({'status': 'BigQuery Error', 'error': str(e)}), 500
+        return {'status': 'BigQuery Error', 'error': str(e)}, 500
+
+def render_metrics():
+    """Prometheus text (spool gauges refreshed first)"""
+    if SPOOL_ENABLED:
+        stats = get_event_spool().get_stats()
+        SPOOL_BYTES.set(stats['spool_bytes'])
+        SPOOL_LAG_BYTES.set(stats['lag_bytes'])
+        SPOOL_LAG_SECONDS.set(stats['lag_secs'])
+    return REGISTRY.render()
+
+# ==============================================================================
+# WEBHOOK ENDPOINTS
+# ==============================================================================
+
+@app.route('/', methods=['GET'])
+def health_check():
+    """Health check endpoint for Cloud Run"""
+    return jsonify(health_status()), 200
+
+@app.route('/webhook', methods=['GET', 'POST'])
+def zoom_webhook():
+    """
+    Main webhook endpoint
+
+    FLOW:
+    1. Receive event from Zoom
+    2. Validate (for URL validation challenge)
+    3. Parse event data
+    4. Write to GCS (raw backup)
+    5. Stream to BigQuery (immediate query)
+       (steps 4-5: the sinks listed in EVENT_SINKS, e.g. 'local')
+    6. Return success to Zoom
+
+    WITH PIPELINE_ENABLED:
+    - Steps 4-5 run in background workers, Zoom gets 200 right after parsing
+    - Queue full -> 503 + Retry-After, Zoom redelivers later
+
+    WITH SPOOL_ENABLED (takes precedence over PIPELINE_ENABLED):
+    - Steps 4-5 become one append to the local spool, Zoom gets 200 once
+      it is on disk; the replayer writes to the sinks with retries
+    - Spool write error -> 503 + Retry-After
+
+    WITH DEDUP_ENABLED:
+    - An event_id seen recently is answered 200 without any write
+    """
+    if request.method == 'GET':
+        return jsonify(webhook_info()), 200
+
+    IN_FLIGHT.inc()
+    start = time.perf_counter()
+    event, outcome = '', 'error'
+    try:
+        response, event, outcome = handle_webhook_event()
+        return response
+    finally:
+        IN_FLIGHT.dec()
+        REQUEST_SECONDS.observe(time.perf_counter() - start)
+        EVENTS.inc(event_type=event_type_label(event), outcome=outcome)
+
+def handle_webhook_event():
+    """
+    Process one POSTed webhook event
+
+    RETURNS:
+    - (flask response, event name, outcome label for metrics)
+    """
+    # Parse the body once; the same bytes become raw_payload
+    (body, status, headers), event, outcome, row_data = accept_webhook_event(
+        request.get_data(), datetime.utcnow()
+    )
+
+    if row_data is not None:
+        if SPOOL_ENABLED or PIPELINE_ENABLED:
+            (body, status, headers), outcome = hand_off_event(row_data)
+        else:
+            # Write to every configured sink (default: GCS raw backup, then BigQuery)
+            for _, write in get_event_sinks():
+                write(row_data)
+            observe_event(row_data)
+
+    return (jsonify(body), status, headers), event, outcome
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint (request / stage latency, event counters)"""
+    if not METRICS_ENABLED:
+        return jsonify({'status': 'metrics disabled'}), 404
+    return render_metrics(), 200, {'Content-Type': METRICS_CONTENT_TYPE}
 
 # ==============================================================================
-# RUN SERVER
+# TEST ENDPOINTS
 # ==============================================================================
 
+@app.route('/test-gcs', methods=['GET'])
+def test_gcs():
+    """Test GCS connection"""
+    body, status = check_gcs()
+    return jsonify(body), status
+
+@app.route('/test-bq', methods=['GET'])
+def test_bq():
+    """Test BigQuery connection"""
+    body, status = check_bq()
+    return jsonify(body), status
+
+# ==============================================================================
+# STARTUP
+# ==============================================================================
+
+record_startup('module_import', _MODULE_START)
+if STARTUP_WARM:
+    warm_up()
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8080))
     print("=" * 60)